@@ -0,0 +1,264 @@
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+
+# Значение, сохранённое через get_or_set: мягкий срок жизни и время,
+# потраченное на вычисление, нужны для раннего обновления
+Entry = namedtuple('Entry', 'value expires_at delta')
+
+_MISSING = object()
+
+
+class FileCache(FileBasedCache):
+    """Файловый кэш с атомарным add.
+
+    У FileBasedCache add — это has_key и затем set, и два процесса
+    могут «добавить» ключ оба; на add держится блокировка пересчёта
+    TieredCache. Здесь запись готовится во временном файле и ставится
+    на место через os.link, который не перезаписывает существующий
+    файл: из одновременных add успешен ровно один.
+    """
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # Истёкшую запись has_key удаляет, после этого ключ свободен
+        if self.has_key(key, version):  # noqa: W601
+            return False
+        self._createdir()
+        fname = self._key_to_file(key, version)
+        self._cull()
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        try:
+            with open(fd, 'wb') as f:
+                self._write_content(f, timeout, value)
+            os.link(tmp_path, fname)
+        except FileExistsError:
+            return False
+        finally:
+            os.remove(tmp_path)
+        return True
+
+
+class TieredCache(BaseCache):
+    """Двухуровневый кэш: LRU в памяти процесса поверх общего кэша.
+
+    L1 живёт в процессе и хранит записи не дольше LOCAL_TIMEOUT секунд,
+    L2 — любой бэкенд из CACHES (OPTIONS['SHARED']), общий для всех
+    процессов. get_or_set обновляет запись заранее с вероятностью,
+    растущей к концу срока (XFetch), а пересчитывает её только процесс,
+    взявший блокировку в L2; остальные отдают прежнее значение.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED', 'shared')
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 2)
+        self._local_max_entries = options.get('LOCAL_MAX_ENTRIES', 1000)
+        self._beta = options.get('EARLY_REFRESH_BETA', 1.0)
+        self._stale_timeout = options.get('STALE_TIMEOUT', 60)
+        self._lock_timeout = options.get('LOCK_TIMEOUT', 30)
+        self._lock_wait = options.get('LOCK_WAIT', 5)
+        self._local = OrderedDict()
+        self._local_lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    # L1
+
+    def _local_get(self, key):
+        with self._local_lock:
+            item = self._local.get(key)
+            if item is None:
+                return _MISSING
+            value, expires_at = item
+            if expires_at <= time.time():
+                del self._local[key]
+                return _MISSING
+            self._local.move_to_end(key)
+            return value
+
+    def _local_set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        expires_at = time.time() + self._local_timeout
+        backend_timeout = self.get_backend_timeout(timeout)
+        if backend_timeout is not None:
+            expires_at = min(expires_at, backend_timeout)
+        with self._local_lock:
+            self._local[key] = (value, expires_at)
+            self._local.move_to_end(key)
+            while len(self._local) > self._local_max_entries:
+                self._local.popitem(last=False)
+
+    def _local_delete(self, *keys):
+        with self._local_lock:
+            for key in keys:
+                self._local.pop(key, None)
+
+    # Обычный интерфейс кэша
+
+    def _raw_get(self, key, version):
+        local_key = self.make_key(key, version)
+        value = self._local_get(local_key)
+        if value is _MISSING:
+            value = self.shared.get(key, _MISSING, version=version)
+            if value is not _MISSING:
+                self._local_set(local_key, value)
+        return value
+
+    def get(self, key, default=None, version=None):
+        value = self._raw_get(key, version)
+        if value is _MISSING:
+            return default
+        if isinstance(value, Entry):
+            return value.value
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._local_set(self.make_key(key, version), value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._local_set(self.make_key(key, version), value, timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._local_delete(self.make_key(key, version))
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._local_delete(self.make_key(key, version))
+        self.shared.delete(key, version=version)
+
+    def get_many(self, keys, version=None):
+        found = {}
+        missing = []
+        for key in keys:
+            value = self._local_get(self.make_key(key, version))
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            for key, value in self.shared.get_many(
+                    missing, version=version).items():
+                self._local_set(self.make_key(key, version), value)
+                found[key] = value
+        return {
+            key: value.value if isinstance(value, Entry) else value
+            for key, value in found.items()
+        }
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if key not in failed:
+                self._local_set(self.make_key(key, version), value, timeout)
+        return failed
+
+    def delete_many(self, keys, version=None):
+        self._local_delete(*(self.make_key(key, version) for key in keys))
+        self.shared.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        if self._local_get(self.make_key(key, version)) is not _MISSING:
+            return True
+        return self.shared.has_key(key, version=version)  # noqa: W601
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        self._local_set(self.make_key(key, version), value)
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        value = self.shared.decr(key, delta, version=version)
+        self._local_set(self.make_key(key, version), value)
+        return value
+
+    def clear(self):
+        """Очищает L1 и общий кэш.
+
+        Если общий кэш хранит ещё и сессии (SESSION_CACHE_ALIAS), он не
+        трогается: иначе очистка ленты разлогинила бы всех пользователей.
+        """
+        with self._local_lock:
+            self._local.clear()
+        if self._shared_alias != settings.SESSION_CACHE_ALIAS:
+            self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+    # Защита от одновременного пересчёта
+
+    def _lock_key(self, key):
+        return 'tiered-lock:' + key
+
+    def _acquire(self, key, version):
+        return self.shared.add(self._lock_key(key), 1, self._lock_timeout,
+                               version=version)
+
+    def _release(self, key, version):
+        self.shared.delete(self._lock_key(key), version=version)
+
+    def _is_fresh(self, entry):
+        if entry.expires_at is None:
+            return True
+        # XFetch: чем дольше считается значение и чем ближе конец срока,
+        # тем вероятнее, что этот запрос обновит его заранее
+        jitter = entry.delta * self._beta * -math.log(1 - random.random())
+        return time.time() + jitter < entry.expires_at
+
+    def _wait_for(self, key, version):
+        deadline = time.time() + self._lock_wait
+        while time.time() < deadline:
+            time.sleep(0.05)
+            value = self.shared.get(key, _MISSING, version=version)
+            if value is not _MISSING:
+                self._local_set(self.make_key(key, version), value)
+                return value
+        return _MISSING
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        value = self._raw_get(key, version)
+        if isinstance(value, Entry):
+            if self._is_fresh(value):
+                return value.value
+            if not self._acquire(key, version):
+                return value.value
+        elif value is not _MISSING:
+            return value
+        elif not self._acquire(key, version):
+            value = self._wait_for(key, version)
+            if value is not _MISSING:
+                return value.value if isinstance(value, Entry) else value
+            if not self._acquire(key, version):
+                # Держатель блокировки не успел — считаем сами, без записи
+                return default() if callable(default) else default
+        try:
+            started = time.time()
+            result = default() if callable(default) else default
+            delta = time.time() - started
+            expires_at = self.get_backend_timeout(timeout)
+            entry = Entry(result, expires_at, delta)
+            # В L2 запись живёт дольше мягкого срока, чтобы пока один
+            # процесс пересчитывает её, остальные отдавали старую
+            hard_timeout = None
+            if expires_at is not None:
+                hard_timeout = expires_at - time.time() + self._stale_timeout
+            self.shared.set(key, entry, hard_timeout, version=version)
+            self._local_set(self.make_key(key, version), entry, timeout)
+            return result
+        finally:
+            self._release(key, version)
@@ -0,0 +1,175 @@
+import json
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger('yatube.jobs')
+
+PRIORITY_LOW = -10
+PRIORITY_NORMAL = 0
+PRIORITY_HIGH = 10
+
+# Имя задачи — функция; заполняется декоратором task из модулей tasks.py
+_registry = {}
+
+
+def task(name):
+    """Регистрирует функцию как задачу очереди под именем name."""
+    def register(func):
+        _registry[name] = func
+        return func
+    return register
+
+
+def enqueue(name, args=(), kwargs=None, priority=PRIORITY_NORMAL,
+            key=None, delay=0, max_attempts=None):
+    """Ставит задачу в очередь и возвращает её Job.
+
+    Аргументы сохраняются в JSON. Если задача с таким key уже есть,
+    новая не создаётся и возвращается существующая. Внутри транзакции
+    задача станет видна воркеру только после коммита.
+    """
+    fields = {
+        'name': name,
+        'args': json.dumps(list(args)),
+        'kwargs': json.dumps(kwargs or {}),
+        'priority': priority,
+        'run_at': timezone.now() + timedelta(seconds=delay),
+        'max_attempts': max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    }
+    if key is None:
+        return Job.objects.create(**fields)
+    return Job.objects.get_or_create(key=key, defaults=fields)[0]
+
+
+def claim(worker, limit=1):
+    """Забирает до limit готовых задач и возвращает их id.
+
+    Без SELECT ... FOR UPDATE: задача достаётся тому воркеру, чей UPDATE
+    сменил её состояние, так что очередь работает и на SQLite.
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(
+        status=Job.QUEUED, run_at__lte=now
+    ).order_by('-priority', 'run_at', 'id').values_list('id', flat=True)
+    claimed = []
+    for job_id in candidates[:limit * 2]:
+        taken = Job.objects.filter(id=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING, worker=worker, started=now,
+            attempts=F('attempts') + 1,
+        )
+        if taken:
+            claimed.append(job_id)
+            if len(claimed) == limit:
+                break
+    return claimed
+
+
+def backoff(attempt):
+    """Пауза перед повтором: растёт вдвое, со случайным разбросом."""
+    delay = min(settings.JOBS_BACKOFF_MAX,
+                settings.JOBS_BACKOFF_BASE * 2 ** (attempt - 1))
+    return delay * random.uniform(0.5, 1)
+
+
+def execute(job_id):
+    """Выполняет забранную задачу и записывает результат.
+
+    Упавшая задача возвращается в очередь с паузой backoff, пока не
+    исчерпает max_attempts, после чего остаётся в состоянии failed.
+    """
+    job = Job.objects.get(id=job_id)
+    try:
+        func = _registry.get(job.name)
+        if func is None:
+            raise LookupError('Задача {} не зарегистрирована'.format(
+                job.name))
+        func(*json.loads(job.args), **json.loads(job.kwargs))
+    except Exception:
+        error = traceback.format_exc()
+        now = timezone.now()
+        if job.attempts < job.max_attempts:
+            changes = {'status': Job.QUEUED, 'run_at': now + timedelta(
+                seconds=backoff(job.attempts))}
+        else:
+            changes = {'status': Job.FAILED, 'finished': now}
+        Job.objects.filter(id=job.id).update(error=error, **changes)
+        logger.warning('Задача %s #%s, попытка %s: %s', job.name, job.id,
+                       job.attempts, error.strip().splitlines()[-1])
+        return False
+    Job.objects.filter(id=job.id).update(
+        status=Job.DONE, finished=timezone.now())
+    return True
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи упавших воркеров.
+
+    Задача, выполнявшаяся дольше JOBS_RUNNING_TIMEOUT, считается
+    прерванной; попытка уже засчитана при её захвате.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        started__lt=now - timedelta(seconds=settings.JOBS_RUNNING_TIMEOUT),
+    )
+    requeued = stale.filter(attempts__lt=F('max_attempts')).update(
+        status=Job.QUEUED, worker='')
+    stale.update(status=Job.FAILED, finished=now,
+                 error='Воркер не завершил задачу')
+    return requeued
+
+
+def purge():
+    """Удаляет выполненные задачи старше JOBS_KEEP_DONE секунд."""
+    deadline = timezone.now() - timedelta(seconds=settings.JOBS_KEEP_DONE)
+    return Job.objects.filter(
+        status=Job.DONE, finished__lt=deadline).delete()[0]
+
+
+def _seconds(values):
+    values = sorted(values)
+    if not values:
+        return {'avg': 0, 'p95': 0, 'max': 0}
+    return {
+        'avg': round(sum(values) / len(values), 3),
+        'p95': round(values[int(0.95 * (len(values) - 1))], 3),
+        'max': round(values[-1], 3),
+    }
+
+
+def stats(window=3600, sample=1000):
+    """Глубина очереди и задержки выполненных за window секунд задач.
+
+    wait — от run_at до начала выполнения, run — само выполнение.
+    """
+    now = timezone.now()
+    depth = dict.fromkeys((status for status, label in Job.STATUSES), 0)
+    depth.update(
+        Job.objects.values_list('status').annotate(count=Count('id')))
+    ready = Job.objects.filter(status=Job.QUEUED, run_at__lte=now)
+    oldest = ready.aggregate(oldest=Min('run_at'))['oldest']
+    recent = list(Job.objects.filter(
+        status=Job.DONE, finished__gte=now - timedelta(seconds=window)
+    ).order_by('-finished').values_list(
+        'run_at', 'started', 'finished')[:sample])
+    return {
+        'depth': depth,
+        'ready': ready.count(),
+        'oldest_ready_seconds': round(
+            (now - oldest).total_seconds(), 3) if oldest else 0,
+        'done': len(recent),
+        'wait_seconds': _seconds(
+            max(0, (started - run_at).total_seconds())
+            for run_at, started, finished in recent),
+        'run_seconds': _seconds(
+            (finished - started).total_seconds()
+            for run_at, started, finished in recent),
+    }
@@ -0,0 +1,56 @@
+import base64
+
+from django.core.mail import EmailMultiAlternatives
+from django.core.mail.backends.base import BaseEmailBackend
+
+from . import jobs
+
+
+def serialize(message):
+    """Письмо в виде словаря, который можно сохранить в JSON."""
+    attachments = []
+    for attachment in message.attachments:
+        # MIMEBase-вложения в очередь не попадают, только кортежи
+        filename, content, mimetype = attachment
+        if isinstance(content, str):
+            content = content.encode()
+        attachments.append(
+            [filename, base64.b64encode(content).decode(), mimetype])
+    return {
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': getattr(message, 'alternatives', []),
+        'attachments': attachments,
+    }
+
+
+def deserialize(data):
+    message = EmailMultiAlternatives(
+        subject=data['subject'], body=data['body'],
+        from_email=data['from_email'], to=data['to'], cc=data['cc'],
+        bcc=data['bcc'], reply_to=data['reply_to'], headers=data['headers'],
+        alternatives=[tuple(item) for item in data['alternatives']],
+    )
+    for filename, content, mimetype in data['attachments']:
+        message.attach(filename, base64.b64decode(content), mimetype)
+    return message
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Не отправляет письма сам, а ставит их в очередь core.jobs.
+
+    Воркер отправляет их бэкендом JOBS_EMAIL_BACKEND, так что запрос
+    не ждёт почтовый сервер, а сбой отправки повторяется.
+    """
+
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            jobs.enqueue('core.send_email', args=[serialize(message)],
+                         priority=jobs.PRIORITY_HIGH)
+        return len(email_messages)
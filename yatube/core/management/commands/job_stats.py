@@ -0,0 +1,19 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = ('Печатает в JSON глубину очереди core.jobs и задержки '
+            'выполненных задач')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window', type=int, default=3600,
+                            help='За сколько последних секунд считать '
+                                 'задержки')
+
+    def handle(self, *args, **options):
+        self.stdout.write(json.dumps(
+            jobs.stats(window=options['window']), indent=2))
@@ -0,0 +1,124 @@
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from core import jobs
+
+# Как часто воркер возвращает брошенные задачи и чистит выполненные
+HOUSEKEEPING_INTERVAL = 60
+
+
+def _run(job_id):
+    # Соединение потока живёт, как в обработке запроса: по CONN_MAX_AGE
+    close_old_connections()
+    try:
+        return jobs.execute(job_id)
+    finally:
+        close_old_connections()
+
+
+def _init_process():
+    # Дочерний процесс не должен пользоваться соединениями родителя
+    for conn in connections.all():
+        conn.connection = None
+
+
+class Command(BaseCommand):
+    help = ('Выполняет задачи очереди core.jobs в пуле потоков или '
+            'процессов; --burst — до опустошения очереди')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=('thread', 'process'),
+                            default='thread')
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.JOBS_CONCURRENCY,
+            help='Размер пула; 0 — выполнять задачи в самом воркере')
+        parser.add_argument('--burst', action='store_true',
+                            help='Выйти, когда готовых задач не останется')
+        parser.add_argument('--poll-interval', type=float,
+                            default=settings.JOBS_POLL_INTERVAL)
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        worker = '{}:{}'.format(socket.gethostname(), os.getpid())
+        concurrency = options['concurrency']
+        executor = self.executor(options['mode'], concurrency)
+        running = set()
+        self.done = self.failed = 0
+        self.housekeeping = 0
+        try:
+            while not self.stopping:
+                self.housekeep()
+                finished = {future for future in running if future.done()}
+                self.count(finished)
+                running -= finished
+                free = concurrency - len(running) if executor else 1
+                claimed = jobs.claim(worker, free) if free > 0 else []
+                for job_id in claimed:
+                    if executor is None:
+                        self.count_result(jobs.execute(job_id))
+                    else:
+                        running.add(executor.submit(_run, job_id))
+                if claimed:
+                    continue
+                if options['burst'] and not running:
+                    break
+                if running:
+                    wait(running, timeout=options['poll_interval'],
+                         return_when=FIRST_COMPLETED)
+                else:
+                    time.sleep(options['poll_interval'])
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+                self.count(running)
+        self.stdout.write('Выполнено задач: {}, с ошибкой: {}'.format(
+            self.done, self.failed))
+
+    @staticmethod
+    def executor(mode, concurrency):
+        if not concurrency:
+            return None
+        if mode == 'process':
+            return ProcessPoolExecutor(
+                max_workers=concurrency,
+                mp_context=multiprocessing.get_context('fork'),
+                initializer=_init_process,
+            )
+        return ThreadPoolExecutor(max_workers=concurrency)
+
+    def housekeep(self):
+        if time.monotonic() - self.housekeeping > HOUSEKEEPING_INTERVAL:
+            jobs.requeue_stale()
+            jobs.purge()
+            self.housekeeping = time.monotonic()
+
+    def count(self, futures):
+        for future in futures:
+            try:
+                succeeded = future.result()
+            except Exception as error:
+                # Задача останется running и вернётся в очередь
+                # через JOBS_RUNNING_TIMEOUT
+                jobs.logger.error('Сбой воркера: %r', error)
+                succeeded = False
+            self.count_result(succeeded)
+
+    def count_result(self, succeeded):
+        if succeeded:
+            self.done += 1
+        else:
+            self.failed += 1
+
+    def stop(self, signum, frame):
+        # Текущие задачи доделываются, новые не забираются
+        self.stopping = True
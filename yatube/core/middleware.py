@@ -0,0 +1,240 @@
+import contextvars
+import json
+import logging
+import math
+import random
+import time
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import connections
+from django.template.backends.django import Template
+
+from . import ratelimit, routers
+from .views import too_many_requests
+
+logger = logging.getLogger('yatube.performance')
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+_MISSING = object()
+
+
+class RequestMetrics:
+    """Счётчики одного запроса: SQL, шаблоны, кэш."""
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper: оборачивает каждый запрос к базе
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_count += 1
+            self.sql_time += time.perf_counter() - started
+
+
+def _timed_render(render):
+    @wraps(render)
+    def wrapper(self, *args, **kwargs):
+        metrics = _current.get()
+        # Вложенный рендер (render_to_string внутри страницы) уже входит
+        # во время внешнего — считаем только самый внешний
+        if metrics is None or metrics.template_depth:
+            return render(self, *args, **kwargs)
+        metrics.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            metrics.template_time += time.perf_counter() - started
+            metrics.template_depth -= 1
+    wrapper.instrumented = True
+    return wrapper
+
+
+def _counted_get(get):
+    @wraps(get)
+    def wrapper(key, default=None, version=None):
+        value = get(key, _MISSING, version=version)
+        metrics = _current.get()
+        if metrics is not None and not metrics.cache_depth:
+            if value is _MISSING:
+                metrics.cache_misses += 1
+            else:
+                metrics.cache_hits += 1
+        return default if value is _MISSING else value
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    @wraps(get_many)
+    def wrapper(keys, version=None):
+        keys = list(keys)
+        found = get_many(keys, version=version)
+        metrics = _current.get()
+        if metrics is not None and not metrics.cache_depth:
+            metrics.cache_hits += len(found)
+            metrics.cache_misses += len(keys) - len(found)
+        return found
+    return wrapper
+
+
+def _counted_get_or_set(get_or_set):
+    @wraps(get_or_set)
+    def wrapper(key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        metrics = _current.get()
+        if metrics is None:
+            return get_or_set(key, default, timeout, version=version)
+        computed = []
+
+        def compute():
+            computed.append(True)
+            return default() if callable(default) else default
+
+        # Внутренние get бэкенда не считаем: обращение одно — попадание,
+        # если значение не пришлось вычислять
+        metrics.cache_depth += 1
+        try:
+            return get_or_set(key, compute, timeout, version=version)
+        finally:
+            metrics.cache_depth -= 1
+            if computed:
+                metrics.cache_misses += 1
+            else:
+                metrics.cache_hits += 1
+    return wrapper
+
+
+def _instrument_cache(cache):
+    # Экземпляры кэшей свои у каждого потока, поэтому оборачиваем
+    # методы экземпляра один раз, а не класс бэкенда
+    if not getattr(cache, 'instrumented', False):
+        cache.get = _counted_get(cache.get)
+        cache.get_many = _counted_get_many(cache.get_many)
+        cache.get_or_set = _counted_get_or_set(cache.get_or_set)
+        cache.instrumented = True
+
+
+class PerformanceMiddleware:
+    """Замеряет время запроса, SQL, шаблонов и обращения к кэшу.
+
+    Замеряется доля PERFORMANCE_SAMPLE_RATE запросов; итог пишется
+    строкой JSON в лог yatube.performance и, если включено
+    PERFORMANCE_SERVER_TIMING, в заголовок Server-Timing.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not getattr(Template.render, 'instrumented', False):
+            Template.render = _timed_render(Template.render)
+
+    def __call__(self, request):
+        if random.random() >= settings.PERFORMANCE_SAMPLE_RATE:
+            return self.get_response(request)
+        for alias in settings.PERFORMANCE_CACHE_ALIASES:
+            _instrument_cache(caches[alias])
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - started
+        if settings.PERFORMANCE_SERVER_TIMING:
+            response['Server-Timing'] = self.server_timing(metrics, total)
+        self.log(request, response, metrics, total)
+        return response
+
+    @staticmethod
+    def server_timing(metrics, total):
+        return ', '.join([
+            'total;dur={:.1f}'.format(total * 1000),
+            'sql;dur={:.1f};desc="{} queries"'.format(
+                metrics.sql_time * 1000, metrics.sql_count),
+            'tpl;dur={:.1f}'.format(metrics.template_time * 1000),
+            'cache;desc="{} hits, {} misses"'.format(
+                metrics.cache_hits, metrics.cache_misses),
+        ])
+
+    @staticmethod
+    def log(request, response, metrics, total):
+        match = request.resolver_match
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'sql_count': metrics.sql_count,
+            'sql_ms': round(metrics.sql_time * 1000, 2),
+            'template_ms': round(metrics.template_time * 1000, 2),
+            'cache_hits': metrics.cache_hits,
+            'cache_misses': metrics.cache_misses,
+        }, ensure_ascii=False))
+
+
+class ReplicaStickinessMiddleware:
+    """Read-your-writes для PrimaryReplicaRouter.
+
+    После запроса, который что-то записал, ставит cookie на
+    REPLICA_STICKY_SECONDS секунд; пока она есть, чтение идёт с
+    основной базы, и пользователь видит свои изменения сразу.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        cookie = settings.REPLICA_STICKY_COOKIE
+        token = routers.start_request(pinned=cookie in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            state = routers.finish_request(token)
+        if state.written and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                cookie, '1', max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class RateLimitMiddleware:
+    """Ограничивает частоту запросов к URL из RATE_LIMITS.
+
+    Правило задаётся по имени URL: корзины пользователя и IP-адреса и
+    методы, которые учитываются (по умолчанию POST). Когда корзина
+    пуста, отвечает 429 с заголовком Retry-After.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        name = request.resolver_match.view_name
+        rule = settings.RATE_LIMITS.get(name)
+        if rule is None or request.method not in rule.get(
+                'methods', ('POST',)):
+            return None
+        retry_after = ratelimit.hit(ratelimit.buckets(request, name, rule))
+        if retry_after:
+            return too_many_requests(request, math.ceil(retry_after))
+        return None
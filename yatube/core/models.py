@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 class CreatedModel(models.Model):
@@ -11,3 +12,63 @@ class CreatedModel(models.Model):
     class Meta:
         # Это абстрактная модель:
         abstract = True
+
+
+class Job(CreatedModel):
+    """Фоновая задача очереди core.jobs."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Не выполнена'),
+    )
+    name = models.CharField(max_length=200, verbose_name='Задача')
+    args = models.TextField(default='[]', verbose_name='Аргументы, JSON')
+    kwargs = models.TextField(
+        default='{}', verbose_name='Именованные аргументы, JSON')
+    # Больше — раньше
+    priority = models.SmallIntegerField(default=0, verbose_name='Приоритет')
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED,
+        verbose_name='Состояние'
+    )
+    # Ключ идемпотентности: вторая задача с тем же ключом не создаётся
+    key = models.CharField(
+        max_length=200,
+        unique=True,
+        null=True,
+        blank=True,
+        verbose_name='Ключ'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name='Попыток')
+    max_attempts = models.PositiveSmallIntegerField(
+        default=5, verbose_name='Предел попыток')
+    run_at = models.DateTimeField(
+        default=timezone.now, verbose_name='Не раньше')
+    started = models.DateTimeField(
+        null=True, blank=True, verbose_name='Начата')
+    finished = models.DateTimeField(
+        null=True, blank=True, verbose_name='Завершена')
+    worker = models.CharField(
+        max_length=100, blank=True, verbose_name='Воркер')
+    error = models.TextField(blank=True, verbose_name='Последняя ошибка')
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Очередь задач'
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_at'],
+                         name='job_ready_idx'),
+            models.Index(fields=['status', 'finished'],
+                         name='job_status_finished_idx'),
+        ]
+
+    def __str__(self):
+        return '{} #{}'.format(self.name, self.pk)
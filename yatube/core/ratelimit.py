@@ -0,0 +1,66 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+PREFIX = 'ratelimit:'
+
+
+def client_ip(request):
+    # За обратным прокси REMOTE_ADDR должен выставлять сам прокси
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def buckets(request, name, rule):
+    """Корзины запроса: (ключ, запросов, за секунд).
+
+    Пользователь ограничивается правилом 'user', адрес — правилом 'ip';
+    у анонима корзины пользователя нет.
+    """
+    result = []
+    if 'user' in rule and request.user.is_authenticated:
+        result.append(('{}{}:user:{}'.format(PREFIX, name, request.user.pk),)
+                      + tuple(rule['user']))
+    if 'ip' in rule:
+        result.append(('{}{}:ip:{}'.format(PREFIX, name, client_ip(request)),)
+                      + tuple(rule['ip']))
+    return result
+
+
+def gcra(tat, now, limit, period):
+    """Generic cell rate algorithm — token bucket одним числом.
+
+    tat — теоретическое время прихода следующего запроса. Возвращает
+    новое tat и сколько секунд ждать (0 — запрос пропускается). Корзина
+    вмещает limit запросов и наполняется по одному за period / limit.
+    """
+    interval = period / limit
+    tat = max(tat or now, now)
+    allowed_at = tat - interval * (limit - 1)
+    if allowed_at > now:
+        return tat, allowed_at - now
+    return tat + interval, 0
+
+
+def hit(request_buckets, now=None):
+    """Списывает запрос со всех корзин; возвращает паузу до повтора.
+
+    Одно чтение get_many и одна запись set_many. Отклонённый запрос
+    корзины не расходует. Проверка не атомарна: параллельные запросы
+    могут изредка проскочить сверх лимита, зато без блокировок.
+    """
+    cache = caches[settings.RATE_LIMIT_CACHE]
+    now = time.time() if now is None else now
+    stored = cache.get_many([key for key, limit, period in request_buckets])
+    updated = {}
+    retry_after = 0
+    for key, limit, period in request_buckets:
+        tat, wait = gcra(stored.get(key), now, limit, period)
+        updated[key] = tat
+        retry_after = max(retry_after, wait)
+    if retry_after:
+        return retry_after
+    if updated:
+        cache.set_many(updated, max(
+            period for key, limit, period in request_buckets))
+    return 0
@@ -0,0 +1,62 @@
+import contextvars
+import random
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Состояние текущего запроса, его заводит ReplicaStickinessMiddleware
+_request_state = contextvars.ContextVar('replica_state', default=None)
+
+
+class RequestState:
+    def __init__(self, pinned=False):
+        # pinned — читать с основной базы до конца запроса
+        self.pinned = pinned
+        self.written = False
+
+
+def start_request(pinned=False):
+    return _request_state.set(RequestState(pinned))
+
+
+def finish_request(token):
+    state = _request_state.get()
+    _request_state.reset(token)
+    return state
+
+
+class PrimaryReplicaRouter:
+    """Запись — в основную базу, чтение — со случайной реплики.
+
+    Реплики читаются только внутри запроса. Команды и фоновые задачи,
+    транзакции и пользователь, который недавно писал (read-your-writes:
+    после первой записи — до конца запроса, по cookie — ещё несколько
+    секунд), читают с основной базы.
+    """
+
+    def _use_primary(self):
+        if not settings.DATABASE_REPLICAS:
+            return True
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return True
+        state = _request_state.get()
+        return state is None or state.pinned
+
+    def db_for_read(self, model, **hints):
+        # Сессия, не доехавшая до реплики, разлогинила бы пользователя
+        if model._meta.app_label == 'sessions' or self._use_primary():
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.pinned = state.written = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На всех базах одни и те же данные
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
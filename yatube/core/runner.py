@@ -0,0 +1,46 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+FILE_CACHE_BACKENDS = (
+    'core.cache.FileCache',
+    'django.core.cache.backends.filebased.FileBasedCache',
+)
+
+
+class TestRunner(DiscoverRunner):
+    """manage.py test с настройками, общими для всех тестов.
+
+    Замеры производительности выключены: иначе случайно выбранные
+    запросы пишут строки лога в вывод тестов. Файловые кэши лежат во
+    временном каталоге, а не в CACHE_DIR запущенного сайта; корзины
+    ограничения частоты — в памяти процесса, их чистят сами тесты.
+    """
+
+    def get_test_settings(self):
+        caches = {}
+        for alias, params in settings.CACHES.items():
+            if params['BACKEND'] in FILE_CACHE_BACKENDS:
+                params = {**params, 'LOCATION': os.path.join(
+                    self._cache_dir, alias)}
+            caches[alias] = params
+        return {
+            'CACHES': caches,
+            'PERFORMANCE_SAMPLE_RATE': 0,
+            'RATE_LIMIT_CACHE': 'ratelimit',
+        }
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_dir = tempfile.mkdtemp(prefix='yatube-test-cache-')
+        self._test_settings = override_settings(**self.get_test_settings())
+        self._test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._test_settings.disable()
+        shutil.rmtree(self._cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
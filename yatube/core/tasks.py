@@ -0,0 +1,11 @@
+from django.conf import settings
+from django.core.mail import get_connection
+
+from . import jobs
+from .mail import deserialize
+
+
+@jobs.task('core.send_email')
+def send_email(message):
+    connection = get_connection(settings.JOBS_EMAIL_BACKEND)
+    connection.send_messages([deserialize(message)])
@@ -0,0 +1,41 @@
+from django import template
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+register = template.Library()
+
+
+class LockedCacheNode(template.Node):
+    def __init__(self, nodelist, timeout, fragment_name, vary_on):
+        self.nodelist = nodelist
+        self.timeout = timeout
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        timeout = self.timeout.resolve(context)
+        key = make_template_fragment_key(
+            self.fragment_name, [var.resolve(context) for var in self.vary_on])
+        return cache.get_or_set(
+            key, lambda: self.nodelist.render(context),
+            None if timeout is None else int(timeout))
+
+
+@register.tag
+def locked_cache(parser, token):
+    """Как {% cache %}, но истёкший фрагмент пересчитывает один процесс.
+
+    {% locked_cache timeout name var1 var2 %}...{% endlocked_cache %}.
+    Фрагмент хранится через cache.get_or_set: пока процесс, взявший
+    блокировку, рендерит новый, остальные отдают прежний.
+    """
+    nodelist = parser.parse(('endlocked_cache',))
+    parser.delete_first_token()
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(
+            '{} принимает срок и имя фрагмента'.format(bits[0]))
+    return LockedCacheNode(
+        nodelist, parser.compile_filter(bits[1]), bits[2],
+        [parser.compile_filter(bit) for bit in bits[3:]],
+    )
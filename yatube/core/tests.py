@@ -0,0 +1,363 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.core import mail
+from django.core.cache import caches
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+from django.utils import timezone
+
+from core import jobs, middleware, ratelimit, routers
+from core.cache import Entry, FileCache, TieredCache
+from core.middleware import ReplicaStickinessMiddleware
+from core.models import Job
+from posts.feed_cache import card_key, feed_generation
+from posts.models import Post, User
+
+
+class TieredCacheTests(TestCase):
+    def setUp(self):
+        self.cache = TieredCache('', {'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_TIMEOUT': 60,
+            'LOCK_WAIT': 0.1,
+        }})
+        self.cache.clear()
+        self.shared = caches['shared']
+
+    def test_local_tier_serves_without_shared(self):
+        self.cache.set('key', 'value')
+        self.shared.delete('key')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_incr_goes_through_shared_tier(self):
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter'), 2)
+        self.assertEqual(self.shared.get('counter'), 2)
+        self.assertEqual(self.cache.get('counter'), 2)
+
+    def test_get_or_set_computes_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return 'value'
+
+        self.assertEqual(self.cache.get_or_set('key', compute, 60), 'value')
+        self.assertEqual(self.cache.get_or_set('key', compute, 60), 'value')
+        self.assertEqual(len(calls), 1)
+
+    def test_expiring_entry_is_rebuilt_by_lock_holder_only(self):
+        stale = Entry('old', time.time() - 1, 0)
+        self.shared.set('key', stale)
+        self.shared.add('tiered-lock:key', 1)
+        # Блокировка занята другим процессом — отдаём прежнее значение
+        self.assertEqual(self.cache.get_or_set('key', 'new', 60), 'old')
+        self.shared.delete('tiered-lock:key')
+        self.cache.clear()
+        self.shared.set('key', stale)
+        self.assertEqual(self.cache.get_or_set('key', 'new', 60), 'new')
+        self.assertEqual(self.shared.get('key').value, 'new')
+
+    @override_settings(SESSION_CACHE_ALIAS='shared')
+    def test_clear_keeps_sessions(self):
+        self.shared.set('session', 'value')
+        self.cache.clear()
+        self.assertEqual(self.shared.get('session'), 'value')
+
+
+class FileCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = FileCache(directory.name, {})
+
+    def test_concurrent_add_succeeds_once(self):
+        barrier = threading.Barrier(8)
+        results = []
+
+        def add():
+            barrier.wait()
+            results.append(self.cache.add('lock', 1, 30))
+
+        threads = [threading.Thread(target=add) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(self.cache.get('lock'), 1)
+
+    def test_expired_key_can_be_added_again(self):
+        self.assertTrue(self.cache.add('lock', 1, 30))
+        self.assertFalse(self.cache.add('lock', 2, 30))
+        self.cache.set('lock', 1, -1)
+        self.assertTrue(self.cache.add('lock', 2, 30))
+        self.assertEqual(self.cache.get('lock'), 2)
+
+    def test_tests_do_not_share_the_site_cache(self):
+        self.assertTrue(os.path.basename(os.path.dirname(
+            caches['shared']._dir)).startswith('yatube-test-cache-'))
+
+
+class LockedFragmentTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.shared = caches['shared']
+        self.user = User.objects.create_user(username='Author')
+        self.post = Post.objects.create(text='Текст поста', author=self.user)
+
+    def test_expired_fragment_is_served_while_locked(self):
+        key = make_template_fragment_key(
+            'index_page', [feed_generation('index'), '1'])
+        self.shared.set(key, Entry('<p>прежняя лента</p>', time.time() - 1, 0))
+        self.shared.add('tiered-lock:' + key, 1)
+        self.addCleanup(self.shared.delete, 'tiered-lock:' + key)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'прежняя лента')
+        self.assertNotContains(response, 'Текст поста')
+
+    def test_cards_are_rendered_through_get_or_set(self):
+        self.client.get(reverse('posts:index'))
+        card = self.shared.get(card_key(self.post))
+        self.assertIsInstance(card, Entry)
+        self.assertIn('Текст поста', card.value)
+
+
+class PerformanceMiddlewareTests(TestCase):
+    @override_settings(PERFORMANCE_SAMPLE_RATE=1,
+                       PERFORMANCE_SERVER_TIMING=True)
+    def test_sampled_request_is_measured(self):
+        with self.assertLogs('yatube.performance', 'INFO') as logs:
+            response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        self.assertIn('total;dur=', timing)
+        self.assertIn('tpl;dur=', timing)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertGreater(record['sql_count'], 0)
+        self.assertGreater(record['cache_hits'] + record['cache_misses'], 0)
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=0,
+                       PERFORMANCE_SERVER_TIMING=True)
+    def test_unsampled_request_is_untouched(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_get_or_set_counts_one_lookup(self):
+        tiered = TieredCache('', {'OPTIONS': {'SHARED': 'shared'}})
+        tiered.clear()
+        local = caches['ratelimit']
+        local.clear()
+        for cache in (tiered, local):
+            middleware._instrument_cache(cache)
+            metrics = middleware.RequestMetrics()
+            token = middleware._current.set(metrics)
+            try:
+                cache.get_or_set('metrics-key', lambda: 'value')
+                cache.get_or_set('metrics-key', lambda: 'other')
+            finally:
+                middleware._current.reset(token)
+            with self.subTest(cache=type(cache).__name__):
+                self.assertEqual(
+                    (metrics.cache_hits, metrics.cache_misses), (1, 1))
+
+    def test_nested_render_is_counted_once(self):
+        class Page:
+            def __init__(self, child=None):
+                self.child = child
+
+            @middleware._timed_render
+            def render(self):
+                if self.child is not None:
+                    self.child.render()
+                time.sleep(0.02)
+
+        metrics = middleware.RequestMetrics()
+        token = middleware._current.set(metrics)
+        try:
+            started = time.perf_counter()
+            Page(Page()).render()
+            elapsed = time.perf_counter() - started
+        finally:
+            middleware._current.reset(token)
+        self.assertLessEqual(metrics.template_time, elapsed)
+        self.assertEqual(metrics.template_depth, 0)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_STICKY_COOKIE='rp')
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.PrimaryReplicaRouter()
+
+    def test_reads_go_to_replica_until_first_write(self):
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        token = routers.start_request()
+        try:
+            self.assertEqual(self.router.db_for_read(Post), 'replica1')
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+        finally:
+            routers.finish_request(token)
+
+    def test_writer_stays_on_primary_by_cookie(self):
+        reads = []
+
+        def write(request):
+            self.router.db_for_write(Post)
+            return HttpResponse()
+
+        def read(request):
+            reads.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        factory = RequestFactory()
+        response = ReplicaStickinessMiddleware(write)(factory.post('/'))
+        self.assertIn('rp', response.cookies)
+        ReplicaStickinessMiddleware(read)(factory.get('/'))
+        request = factory.get('/')
+        request.COOKIES['rp'] = '1'
+        ReplicaStickinessMiddleware(read)(request)
+        self.assertEqual(reads, ['replica1', 'default'])
+
+
+calls = []
+
+
+@jobs.task('tests.record')
+def record_call(value, fail=False):
+    calls.append(value)
+    if fail:
+        raise ValueError(value)
+
+
+@override_settings(JOBS_BACKOFF_BASE=10, JOBS_BACKOFF_MAX=60)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_priority_and_idempotency(self):
+        low = jobs.enqueue('tests.record', ['low'],
+                           priority=jobs.PRIORITY_LOW)
+        high = jobs.enqueue('tests.record', ['high'],
+                            priority=jobs.PRIORITY_HIGH, key='once')
+        self.assertEqual(
+            jobs.enqueue('tests.record', ['again'], key='once'), high)
+        jobs.enqueue('tests.record', ['later'], delay=60)
+        self.assertEqual(jobs.claim('test', limit=5), [high.pk, low.pk])
+        self.assertEqual(jobs.claim('test'), [])
+        for job_id in (high.pk, low.pk):
+            self.assertTrue(jobs.execute(job_id))
+        self.assertEqual(calls, ['high', 'low'])
+        self.assertEqual(Job.objects.get(pk=low.pk).status, Job.DONE)
+
+    def test_retry_with_backoff_then_fail(self):
+        job = jobs.enqueue('tests.record', ['boom'], {'fail': True},
+                           max_attempts=2)
+        with self.assertLogs('yatube.jobs', 'WARNING'):
+            jobs.claim('test')
+            self.assertFalse(jobs.execute(job.pk))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreaterEqual(job.run_at - timezone.now(),
+                                timedelta(seconds=4))
+        self.assertIn('ValueError: boom', job.error)
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('yatube.jobs', 'WARNING'):
+            jobs.claim('test')
+            jobs.execute(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_stale_running_jobs_are_requeued(self):
+        job = jobs.enqueue('tests.record', ['stale'])
+        jobs.claim('test')
+        Job.objects.filter(pk=job.pk).update(
+            started=timezone.now() - timedelta(days=1))
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.QUEUED)
+
+    def test_worker_command_and_stats(self):
+        jobs.enqueue('tests.record', ['first'])
+        jobs.enqueue('tests.record', ['second'])
+        out = StringIO()
+        call_command('run_jobs', '--burst', '--concurrency', '0',
+                     stdout=out)
+        self.assertEqual(calls, ['first', 'second'])
+        self.assertIn('Выполнено задач: 2', out.getvalue())
+        stats = jobs.stats()
+        self.assertEqual(stats['depth'][Job.DONE], 2)
+        self.assertEqual(stats['ready'], 0)
+        self.assertEqual(stats['done'], 2)
+
+    @override_settings(
+        EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+        JOBS_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+    def test_queued_email(self):
+        mail.send_mail('Тема', 'Текст', 'from@example.com',
+                       ['to@example.com'], html_message='<p>Текст</p>')
+        self.assertEqual(mail.outbox, [])
+        job = Job.objects.get(name='core.send_email')
+        jobs.claim('test')
+        self.assertTrue(jobs.execute(job.pk))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Тема')
+        self.assertEqual(mail.outbox[0].alternatives,
+                         [('<p>Текст</p>', 'text/html')])
+
+
+@override_settings(RATE_LIMITS={
+    'posts:add_comment': {'user': (2, 60), 'ip': (3, 60)},
+})
+@override_settings(RATE_LIMIT_CACHE='ratelimit')
+class RateLimitTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Spammer')
+        cls.other = User.objects.create_user(username='Neighbour')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+
+    def setUp(self):
+        caches['ratelimit'].clear()
+        # Корзины с тестовыми лимитами не должны достаться другим тестам
+        self.addCleanup(caches['ratelimit'].clear)
+        self.url = reverse('posts:add_comment',
+                           kwargs={'post_id': self.post.pk})
+
+    def comment(self, user):
+        self.client.force_login(user)
+        return self.client.post(self.url, {'text': 'Спам'})
+
+    def test_gcra(self):
+        tat, wait = ratelimit.gcra(None, 100.0, 2, 60)
+        self.assertEqual((tat, wait), (130.0, 0))
+        tat, wait = ratelimit.gcra(tat, 100.0, 2, 60)
+        self.assertEqual((tat, wait), (160.0, 0))
+        self.assertEqual(ratelimit.gcra(tat, 100.0, 2, 60), (160.0, 30.0))
+        self.assertEqual(ratelimit.gcra(tat, 130.0, 2, 60)[1], 0)
+
+    def test_user_and_ip_buckets(self):
+        self.assertEqual(self.comment(self.user).status_code, 302)
+        self.assertEqual(self.comment(self.user).status_code, 302)
+        response = self.comment(self.user)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertTemplateUsed(response, 'core/429.html')
+        self.assertEqual(self.post.comments.count(), 2)
+        # Другой пользователь с того же адреса упирается в корзину IP
+        self.assertEqual(self.comment(self.other).status_code, 302)
+        self.assertEqual(self.comment(self.other).status_code, 429)
+        # Чтение не ограничивается
+        self.assertEqual(self.client.get(reverse('posts:index')).status_code,
+                         200)
@@ -17,3 +17,10 @@ def internal_server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html')
+
+
+def too_many_requests(request, retry_after):
+    response = render(request, 'core/429.html',
+                      {'retry_after': retry_after}, status=429)
+    response['Retry-After'] = str(retry_after)
+    return response
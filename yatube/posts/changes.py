@@ -0,0 +1,118 @@
+from collections import defaultdict
+
+from django.db import connections, router, transaction
+from django.db.models import Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Change, Comment, Post
+
+MODELS = {'post': Post, 'comment': Comment}
+
+# Поля объекта в выдаче изменений. comments_count меняется через
+# update() без записи поста в журнал: это значение на момент выдачи,
+# а сами комментарии приходят своими изменениями
+FIELDS = {
+    'post': ('id', 'author__username', 'group__slug', 'pub_date',
+             'modified', 'revision', 'text', 'image', 'comments_count'),
+    'comment': ('id', 'post_id', 'author__username', 'created',
+                'modified', 'revision', 'text'),
+}
+
+LIMIT = 500
+
+# Диапазон id, который record_bulk журналирует одной транзакцией
+BULK_CHUNK = 10000
+
+
+def record(instance, deleted=False):
+    """Пишет изменение объекта в журнал и возвращает номер ревизии."""
+    kind = instance._meta.model_name
+    revision = Change.objects.create(
+        kind=kind, object_id=instance.pk, deleted=deleted).pk
+    if not deleted:
+        MODELS[kind].objects.filter(pk=instance.pk).update(revision=revision)
+        instance.revision = revision
+    return revision
+
+
+def record_bulk():
+    """Пишет в журнал объекты, созданные bulk_create мимо сигналов.
+
+    Такие объекты остаются с revision = 0; после импорта каждый из них
+    получает свою запись журнала. Записи вставляются одним
+    INSERT ... SELECT на диапазон id, ревизии проставляются
+    коррелированным UPDATE, как в миграции 0014. Возвращает число новых
+    записей.
+    """
+    using = router.db_for_write(Change)
+    connection = connections[using]
+    ops = connection.ops
+    sql = (
+        'INSERT INTO {changes} (kind, object_id, deleted, created) '
+        'SELECT %s, id, %s, %s FROM {table} '
+        'WHERE revision = 0 AND id BETWEEN %s AND %s ORDER BY id'
+    )
+    now = ops.adapt_datetimefield_value(timezone.now())
+    total = 0
+    for kind, model in MODELS.items():
+        bounds = model.objects.filter(revision=0).aggregate(
+            first=Min('id'), last=Max('id'))
+        if bounds['first'] is None:
+            continue
+        insert = sql.format(changes=ops.quote_name(Change._meta.db_table),
+                            table=ops.quote_name(model._meta.db_table))
+        latest = Change.objects.filter(
+            kind=kind, object_id=OuterRef('pk')).order_by('-id').values('id')
+        for first in range(bounds['first'], bounds['last'] + 1, BULK_CHUNK):
+            last = min(first + BULK_CHUNK - 1, bounds['last'])
+            with transaction.atomic(using=using):
+                with connection.cursor() as cursor:
+                    cursor.execute(insert, [kind, False, now, first, last])
+                    total += cursor.rowcount
+                # Строка, вставленная параллельно, останется с 0
+                # до следующего вызова
+                model.objects.filter(
+                    revision=0, id__range=(first, last)
+                ).update(revision=Coalesce(Subquery(latest[:1]), 0))
+    return total
+
+
+def latest_revision():
+    return Change.objects.aggregate(revision=Max('id'))['revision'] or 0
+
+
+def changes_since(revision, limit=LIMIT):
+    """Изменения после revision и ревизия, с которой читать дальше.
+
+    Объект, изменённый несколько раз, отдаётся один раз — по последней
+    записи журнала; удалённый — записью {'deleted': True}.
+    """
+    log = list(
+        Change.objects.filter(id__gt=revision).order_by('id').values_list(
+            'id', 'kind', 'object_id', 'deleted')[:limit]
+    )
+    wanted = defaultdict(set)
+    for change_id, kind, object_id, deleted in log:
+        if not deleted:
+            wanted[kind].add(object_id)
+    objects = {
+        kind: {
+            row['id']: row for row in MODELS[kind].objects.filter(
+                id__in=ids).values(*FIELDS[kind])
+        }
+        for kind, ids in wanted.items()
+    }
+    changes = []
+    for change_id, kind, object_id, deleted in log:
+        if deleted:
+            changes.append({'revision': change_id, 'kind': kind,
+                            'id': object_id, 'deleted': True})
+            continue
+        row = objects[kind].get(object_id)
+        # Нет объекта или есть ревизия новее — её запись дальше в журнале
+        if row is None or row['revision'] > change_id:
+            continue
+        changes.append({**row, 'revision': change_id, 'kind': kind,
+                        'deleted': False})
+    return changes, log[-1][0] if log else revision
@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F
+
+from .models import AuthorStats, Group, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+
+
+def _shift(queryset, field, delta):
+    """Атомарно сдвигает счётчик, не опуская его ниже нуля."""
+    if delta < 0:
+        queryset = queryset.filter(**{field + '__gt': 0})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def author_posts_changed(author_id, delta):
+    stats = AuthorStats.objects.filter(user_id=author_id)
+    if not _shift(stats, 'posts_count', delta) and delta > 0:
+        AuthorStats.objects.get_or_create(user_id=author_id)
+        _shift(stats, 'posts_count', delta)
+
+
+def group_posts_changed(group_id, delta):
+    if group_id is not None:
+        _shift(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def post_comments_changed(post_id, delta):
+    _shift(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def author_posts_count(author):
+    """Число постов автора без COUNT(*); stats берётся из select_related."""
+    try:
+        return author.stats.posts_count
+    except AuthorStats.DoesNotExist:
+        return 0
+
+
+def _repair(queryset, field, relation):
+    """Переписывает счётчик там, где он разошёлся с COUNT(*)."""
+    drifted = list(queryset.annotate(actual=Count(relation)).exclude(
+        **{field: F('actual')}
+    ).values_list('pk', 'actual'))
+    model = queryset.model
+    for start in range(0, len(drifted), BATCH_SIZE):
+        model.objects.bulk_update(
+            [model(pk=pk, **{field: actual})
+             for pk, actual in drifted[start:start + BATCH_SIZE]],
+            [field]
+        )
+    return len(drifted)
+
+
+def repair():
+    """Пересчитывает все счётчики; возвращает число исправленных строк."""
+    missing = list(User.objects.filter(stats__isnull=True).values_list(
+        'pk', flat=True))
+    # Размер пачки выбирает бэкенд: SQLite не примет больше 500 строк
+    # в одном INSERT ... SELECT ... UNION
+    AuthorStats.objects.bulk_create(
+        [AuthorStats(user_id=user_id) for user_id in missing],
+        ignore_conflicts=True
+    )
+    return {
+        'created': len(missing),
+        'authors': _repair(AuthorStats.objects.all(), 'posts_count',
+                           'user__posts'),
+        'groups': _repair(Group.objects.all(), 'posts_count', 'posts'),
+        'posts': _repair(Post.objects.all(), 'comments_count', 'comments'),
+    }
@@ -0,0 +1,142 @@
+import io
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from . import changes, counters, feed_cache, timeline
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 2000
+
+
+@contextmanager
+def keep_dates(*fields):
+    """Позволяет bulk_create сохранить заданные даты у auto_now_add-полей."""
+    fields = fields or (
+        Post._meta.get_field('pub_date'),
+        Comment._meta.get_field('created'),
+    )
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _insert(model, objects):
+    with transaction.atomic():
+        model.objects.bulk_create(objects)
+
+
+def _images(count, rng):
+    """Сохраняет count картинок и возвращает их имена для поля image."""
+    names = []
+    for i in range(count):
+        color = tuple(rng.randrange(256) for _ in range(3))
+        buffer = io.BytesIO()
+        Image.new('RGB', (1280, 720), color).save(buffer, 'JPEG')
+        names.append(default_storage.save(
+            'posts/seed_{}.jpg'.format(i), ContentFile(buffer.getvalue())
+        ))
+    return names
+
+
+def _follow_pairs(user_ids, follows, alpha, rng):
+    """Подписки со степенным распределением популярности авторов.
+
+    Вес автора с номером k равен 1 / k ** alpha: несколько авторов
+    собирают большую часть подписчиков, у остальных их почти нет.
+    """
+    authors = list(user_ids)
+    rng.shuffle(authors)
+    weights = [1 / (rank + 1) ** alpha for rank in range(len(authors))]
+    pairs = set()
+    for user_id in user_ids:
+        wanted = min(follows, len(authors) - 1)
+        chosen = set()
+        while len(chosen) < wanted:
+            for author_id in rng.choices(authors, weights, k=wanted):
+                if author_id != user_id and len(chosen) < wanted:
+                    chosen.add(author_id)
+        pairs.update((user_id, author_id) for author_id in chosen)
+    return pairs
+
+
+def seed(users=1000, groups=50, posts=50000, comments=50000,
+         follows=10, days=365, seed=0, images=0, image_share=0.2,
+         alpha=1.2):
+    """Заполняет базу синтетическими данными для замеров.
+
+    При одинаковых параметрах и seed получаются одинаковые данные:
+    images картинок достаются доле постов image_share, подписки
+    распределены по авторам степенно с показателем alpha.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    password = make_password(None)
+    image_names = _images(images, rng)
+    first_user = User.objects.count()
+    _insert(User, [
+        User(username='bench{}_{}'.format(seed, first_user + i),
+             first_name='Имя{}'.format(i), last_name='Фамилия{}'.format(i),
+             password=password)
+        for i in range(users)
+    ])
+    user_ids = list(User.objects.order_by('-id').values_list(
+        'id', flat=True)[:users])
+    first_group = Group.objects.count()
+    _insert(Group, [
+        Group(title='Группа {}'.format(first_group + i),
+              slug='bench-{}-{}'.format(seed, first_group + i),
+              description='Описание группы {}'.format(i))
+        for i in range(groups)
+    ])
+    group_ids = list(Group.objects.order_by('-id').values_list(
+        'id', flat=True)[:groups]) or [None]
+    with keep_dates():
+        for start in range(0, posts, BATCH_SIZE):
+            _insert(Post, [
+                Post(text='Синтетический пост {}'.format(start + i),
+                     author_id=rng.choice(user_ids),
+                     group_id=rng.choice(group_ids + [None]),
+                     image=(rng.choice(image_names)
+                            if image_names and rng.random() < image_share
+                            else ''),
+                     pub_date=now - timedelta(
+                         seconds=rng.randrange(days * 86400)))
+                for i in range(min(BATCH_SIZE, posts - start))
+            ])
+        post_ids = list(Post.objects.order_by('-id').values_list(
+            'id', flat=True)[:posts])
+        for start in range(0, comments, BATCH_SIZE):
+            _insert(Comment, [
+                Comment(text='Синтетический комментарий',
+                        post_id=rng.choice(post_ids),
+                        author_id=rng.choice(user_ids),
+                        created=now - timedelta(
+                            seconds=rng.randrange(days * 86400)))
+                for _ in range(min(BATCH_SIZE, comments - start))
+            ])
+    pairs = sorted(_follow_pairs(user_ids, follows, alpha, rng))
+    for start in range(0, len(pairs), BATCH_SIZE):
+        _insert(Follow, [
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in pairs[start:start + BATCH_SIZE]
+        ])
+    changes.record_bulk()
+    counters.repair()
+    timeline.rebuild(user_ids)
+    # bulk_create не шлёт сигналов, поэтому кэш лент сбрасываем сами
+    feed_cache.bump_all()
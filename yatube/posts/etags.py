@@ -0,0 +1,81 @@
+import hashlib
+
+from django.middleware.csrf import get_token
+
+from .feed_cache import feed_generation
+from .models import Group, Post, User
+
+
+def _etag(request, *parts):
+    """ETag страницы из дешёвых признаков её содержимого.
+
+    В ключ всегда входит пользователь (шапка, кнопки, форма комментария
+    у каждого свои), номер страницы или курсор и порядок выдачи.
+    """
+    parts += (
+        request.user.pk,
+        request.GET.get('cursor') or request.GET.get('page') or '1',
+        request.GET.get('order', ''),
+    )
+    return hashlib.md5(
+        ':'.join(str(part) for part in parts).encode()
+    ).hexdigest()
+
+
+def _follow_scope(request):
+    # Подписка меняет кнопки профиля и поколение 'follow:<id>',
+    # пересчёт рекомендаций — поколение 'recommendations'
+    if request.user.is_authenticated:
+        return ('follow:{}'.format(request.user.pk), 'recommendations')
+    return ()
+
+
+def index_etag(request):
+    return _etag(request, feed_generation('index'))
+
+
+def group_etag(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'id', flat=True).first()
+    if group_id is None:
+        return None
+    return _etag(request, feed_generation('group:{}'.format(group_id)))
+
+
+def profile_etag(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'id', flat=True).first()
+    if author_id is None:
+        return None
+    return _etag(request, feed_generation(
+        'author:{}'.format(author_id), *_follow_scope(request)
+    ))
+
+
+def _form_scope(request):
+    # Страница с формой хранит CSRF-токен, а он меняется при входе:
+    # старая копия из кэша браузера дала бы 403 на отправке формы
+    # (get_token заводит его сразу, чтобы ETag совпал со следующим запросом)
+    if request.user.is_authenticated:
+        get_token(request)
+        return (request.META['CSRF_COOKIE'],)
+    return ()
+
+
+def post_etag(request, post_id):
+    """Правку поста видно по modified, комментарии — по счётчику.
+
+    Поколение ленты автора нужно для числа его постов на странице,
+    поколение группы — для её названия, CSRF-токен — для формы
+    комментария.
+    """
+    row = Post.objects.filter(id=post_id).values_list(
+        'author_id', 'group_id', 'modified', 'comments_count').first()
+    if row is None:
+        return None
+    author_id, group_id, modified, comments_count = row
+    scopes = ['author:{}'.format(author_id)]
+    if group_id is not None:
+        scopes.append('group:{}'.format(group_id))
+    return _etag(request, feed_generation(*scopes),
+                 modified.timestamp(), comments_count, *_form_scope(request))
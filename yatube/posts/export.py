@@ -0,0 +1,92 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from .models import Comment, Post
+
+# Поля выгрузки: имя колонки и путь для values()
+FIELDS = {
+    'posts': (
+        ('id', 'id'),
+        ('author', 'author__username'),
+        ('group', 'group__slug'),
+        ('pub_date', 'pub_date'),
+        ('text', 'text'),
+        ('image', 'image'),
+        ('comments_count', 'comments_count'),
+    ),
+    'comments': (
+        ('id', 'id'),
+        ('post_id', 'post_id'),
+        ('author', 'author__username'),
+        ('group', 'post__group__slug'),
+        ('created', 'created'),
+        ('text', 'text'),
+    ),
+}
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+CHUNK_SIZE = 2000
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def queryset(kind, author=None, group=None, since=None, until=None):
+    """Строки выгрузки: кортежи значений, без создания объектов моделей.
+
+    since и until — даты включительно; диапазон переводится в границы
+    по времени, чтобы фильтр шёл по индексу, а не по функции от даты.
+    """
+    if kind == 'posts':
+        rows = Post.objects.all()
+        prefix, date_field = '', 'pub_date'
+    else:
+        rows = Comment.objects.all()
+        prefix, date_field = 'post__', 'created'
+    if author:
+        rows = rows.filter(author__username=author)
+    if group:
+        rows = rows.filter(**{prefix + 'group__slug': group})
+    if since:
+        rows = rows.filter(**{date_field + '__gte': _start_of_day(since)})
+    if until:
+        rows = rows.filter(**{
+            date_field + '__lt': _start_of_day(until + timedelta(days=1))
+        })
+    return rows.order_by('id').values_list(
+        *(path for name, path in FIELDS[kind])
+    )
+
+
+def _json_value(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+class _Echo:
+    """Псевдофайл для csv.writer: write возвращает строку, а не пишет."""
+
+    def write(self, value):
+        return value
+
+
+def lines(kind, rows, export_format, chunk_size=CHUNK_SIZE):
+    """Генератор строк выгрузки; в памяти держится одна порция строк."""
+    names = [name for name, path in FIELDS[kind]]
+    if export_format == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(names)
+        for row in rows.iterator(chunk_size=chunk_size):
+            yield writer.writerow(row)
+        return
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield json.dumps(
+            dict(zip(names, map(_json_value, row))), ensure_ascii=False
+        ) + '\n'
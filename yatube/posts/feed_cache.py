@@ -0,0 +1,78 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+KEY_PREFIX = 'feed-generation:'
+CARD_PREFIX = 'post-card:'
+
+# Входит в поколение каждой ленты: сдвигается после массовой загрузки,
+# когда перечислять затронутые ленты по одной слишком дорого
+GLOBAL_SCOPE = 'all'
+
+
+def _initial():
+    # Счётчик, вытесненный из кэша, не должен начинаться заново с числа,
+    # под которым уже лежат старые фрагменты
+    return int(time.time() * 1000)
+
+
+def feed_generation(*scopes):
+    """Текущее поколение набора лент, строка для ключа фрагмента."""
+    keys = [KEY_PREFIX + scope for scope in (GLOBAL_SCOPE,) + scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _initial(), None)
+            found[key] = cache.get(key, 0)
+    return '.'.join(str(found[key]) for key in keys)
+
+
+def bump(*scopes):
+    """Сдвигает поколение лент; старые фрагменты просто перестают читаться."""
+    for scope in scopes:
+        key = KEY_PREFIX + scope
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial(), None)
+
+
+def bump_all():
+    """Сдвигает поколение сразу всех лент."""
+    bump(GLOBAL_SCOPE)
+
+
+def post_scopes(post, previous_group_id=None):
+    """Ленты, в которых виден пост."""
+    scopes = ['index', 'author:{}'.format(post.author_id)]
+    for group_id in {post.group_id, previous_group_id} - {None}:
+        scopes.append('group:{}'.format(group_id))
+    return scopes
+
+
+def card_key(post, generation=None):
+    """Ключ отрендеренной карточки поста, общей для всех лент.
+
+    Правка поста меняет modified, а с ним и ключ, так что старая
+    карточка просто перестаёт читаться. Имя автора и ссылка на группу
+    в карточке меняются без правки поста — их смена сдвигает общее
+    поколение лент (generation, по умолчанию текущее), входящее в ключ.
+    """
+    return '{}{}:{}:{}'.format(
+        CARD_PREFIX, post.pk, int(post.modified.timestamp() * 1000000),
+        generation or feed_generation())
+
+
+def evict_card(key):
+    cache.delete(key)
+
+
+def feed_cache_context(request, *scopes):
+    """Переменные шаблона для {% cache %} ленты: версия, страница, TTL."""
+    return {
+        'feed_version': feed_generation(*scopes),
+        'page_key': (request.GET.get('cursor')
+                     or request.GET.get('page') or '1'),
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
+    }
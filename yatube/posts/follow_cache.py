@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Follow
+
+PREFIX = 'following:'
+
+
+def _key(user_id):
+    return '{}{}'.format(PREFIX, user_id)
+
+
+def following_ids(user):
+    """Множество id авторов, на которых подписан user.
+
+    Берётся из кэша одним обращением и запоминается в объекте user до
+    конца запроса, так что проверка подписки дальше идёт без запросов.
+    Подписки, загруженные bulk_create мимо сигналов, видны через
+    FOLLOWING_CACHE_TIMEOUT.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    ids = getattr(user, '_following_ids', None)
+    if ids is None:
+        ids = cache.get(_key(user.pk))
+        if ids is None:
+            ids = frozenset(Follow.objects.filter(
+                user_id=user.pk).values_list('author_id', flat=True))
+            cache.set(_key(user.pk), ids, settings.FOLLOWING_CACHE_TIMEOUT)
+        user._following_ids = ids
+    return ids
+
+
+def is_following(user, author):
+    """author — пользователь или его id."""
+    author_id = getattr(author, 'pk', author)
+    return author_id in following_ids(user)
+
+
+def invalidate(user_id):
+    cache.delete(_key(user_id))
@@ -1,5 +1,11 @@
+from django import forms
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 
+from .changes import LIMIT
+from .export import CONTENT_TYPES, FIELDS
+
+from .images import ingest
 from .models import Comment, Post
 
 
@@ -8,8 +14,37 @@ class PostForm(ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            return ingest(image)
+        return image
+
 
 class CommentForm(ModelForm):
     class Meta:
         model = Comment
         fields = {'text'}
+
+
+class ExportForm(forms.Form):
+    kind = forms.ChoiceField(
+        choices=[(kind, kind) for kind in FIELDS], initial='posts')
+    format = forms.ChoiceField(
+        choices=[(name, name) for name in CONTENT_TYPES], initial='ndjson')
+    author = forms.CharField(required=False)
+    group = forms.SlugField(required=False)
+    since = forms.DateField(required=False)
+    until = forms.DateField(required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        since, until = cleaned_data.get('since'), cleaned_data.get('until')
+        if since and until and since > until:
+            raise forms.ValidationError('Начало периода позже его конца.')
+        return cleaned_data
+
+
+class ChangesForm(forms.Form):
+    since = forms.IntegerField(min_value=0, required=False)
+    limit = forms.IntegerField(min_value=1, max_value=LIMIT, required=False)
@@ -0,0 +1,91 @@
+import io
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from PIL import Image, ImageOps
+
+EXTENSIONS = {
+    'JPEG': 'jpg',
+    'PNG': 'png',
+    'WEBP': 'webp',
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool():
+    # Pillow отпускает GIL при декодировании и ресайзе, поэтому потоков
+    # достаточно; пул ограничивает число одновременных тяжёлых картинок
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_INGEST_WORKERS,
+                thread_name_prefix='image-ingest',
+            )
+        return _executor
+
+
+def _target_size(size, max_pixels):
+    width, height = size
+    if width * height <= max_pixels:
+        return size
+    scale = math.sqrt(max_pixels / (width * height))
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def process(data, image_format, quality, max_pixels):
+    """Уменьшает, поворачивает по EXIF и перекодирует картинку без EXIF."""
+    with Image.open(io.BytesIO(data)) as image:
+        # JPEG умеет декодироваться сразу в уменьшенном масштабе
+        image.draft('RGB', _target_size(image.size, max_pixels))
+        icc_profile = image.info.get('icc_profile')
+        image = ImageOps.exif_transpose(image)
+        target = _target_size(image.size, max_pixels)
+        if target != image.size:
+            image = image.resize(target, Image.LANCZOS)
+        if image_format == 'JPEG' and image.mode != 'RGB':
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode not in ('RGB', 'RGBA', 'L'):
+            image = image.convert('RGBA')
+        output = io.BytesIO()
+        options = {'quality': quality, 'optimize': True}
+        if icc_profile:
+            options['icc_profile'] = icc_profile
+        # exif не передаём — метаданные камеры и геотеги не сохраняются
+        image.save(output, image_format, **options)
+    return output.getvalue()
+
+
+def ingest(uploaded):
+    """Прогоняет загруженную картинку через пул и возвращает новый файл."""
+    image_format = settings.IMAGE_INGEST_FORMAT
+    uploaded.seek(0)
+    future = _pool().submit(
+        process, uploaded.read(), image_format,
+        settings.IMAGE_INGEST_QUALITY, settings.IMAGE_INGEST_MAX_PIXELS,
+    )
+    try:
+        data = future.result(timeout=settings.IMAGE_INGEST_TIMEOUT)
+    except FutureTimeoutError:
+        # Ещё не начатая обработка не займёт поток пула после отказа
+        future.cancel()
+        raise ValidationError('Картинка обрабатывается слишком долго.')
+    except (OSError, ValueError, Image.DecompressionBombError):
+        raise ValidationError('Не удалось обработать картинку.')
+    stem = os.path.splitext(os.path.basename(uploaded.name))[0]
+    name = '{}.{}'.format(stem, EXTENSIONS[image_format])
+    return InMemoryUploadedFile(
+        io.BytesIO(data), 'image', name,
+        Image.MIME[image_format], len(data), None
+    )
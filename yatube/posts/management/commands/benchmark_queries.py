@@ -0,0 +1,98 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+
+from posts import dataset
+from posts.models import Comment, Follow, Group, Post, TimelineEntry, User
+from posts.timeline import follow_feed
+
+
+class Command(BaseCommand):
+    help = ('Печатает планы (EXPLAIN) и время запросов страниц постов '
+            'с составными индексами и без них')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', action='store_true',
+                            help='Сначала наполнить базу синтетикой')
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=50000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def queries(self):
+        """Запросы, которые выполняют представления posts."""
+        per_page = settings.PAGINATE_BY
+        author = User.objects.annotate(n=Count('posts')).order_by('-n')[0]
+        group = Group.objects.annotate(n=Count('posts')).order_by('-n')[0]
+        reader = User.objects.annotate(
+            n=Count('follower')).order_by('-n')[0]
+        post = Post.objects.order_by('-comments_count')[0]
+        total = Post.objects.count()
+        feed, feed_ordering = follow_feed(reader)
+        return [
+            ('index', Post.objects.select_related(
+                'author', 'group')[:per_page]),
+            ('index, последняя страница', Post.objects.select_related(
+                'author', 'group')[max(total - per_page, 0):total]),
+            ('group_posts', group.posts.select_related(
+                'author', 'group')[:per_page]),
+            ('profile', author.posts.select_related(
+                'author', 'group')[:per_page]),
+            ('profile, подписка', Follow.objects.filter(
+                user=reader, author=author)),
+            ('follow_index', feed.order_by(*feed_ordering)[:per_page]),
+            ('post_detail, комментарии', Comment.objects.filter(
+                post=post).select_related('author').order_by('created')),
+            ('рассылка, подписчики', Follow.objects.filter(
+                author=author).values_list('user_id', flat=True)),
+        ]
+
+    def measure(self, repeat):
+        results = {}
+        for name, queryset in self.queries():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(queryset._chain())
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = (statistics.median(timings), queryset.explain())
+        return results
+
+    def dropped_indexes(self):
+        for model in (Post, Comment, Follow, TimelineEntry):
+            for index in model._meta.indexes:
+                yield index.name
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.stdout.write('Наполняю базу...')
+            dataset.seed(users=options['users'], posts=options['posts'],
+                         comments=options['comments'])
+        if not Post.objects.exists():
+            raise CommandError('В базе нет постов, запустите с --seed')
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                for name in self.dropped_indexes():
+                    cursor.execute(
+                        'DROP INDEX {}'.format(connection.ops.quote_name(name))
+                    )
+            before = self.measure(options['repeat'])
+            transaction.set_rollback(True)
+        # Новое соединение: подготовленные запросы не должны пережить
+        # смену схемы, иначе EXPLAIN покажет старый план
+        connection.close()
+        after = self.measure(options['repeat'])
+        for name, (after_ms, after_plan) in after.items():
+            before_ms, before_plan = before[name]
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                '{}: {:.2f} мс без индексов, {:.2f} мс с индексами'.format(
+                    name, before_ms, after_ms)
+            ))
+            self.stdout.write('  до:\n    ' + before_plan.replace(
+                '\n', '\n    '))
+            self.stdout.write('  после:\n    ' + after_plan.replace(
+                '\n', '\n    '))
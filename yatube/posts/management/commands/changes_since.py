@@ -0,0 +1,29 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from posts import changes
+
+
+class Command(BaseCommand):
+    help = ('Выводит в NDJSON изменения постов и комментариев после '
+            'ревизии; последней строкой в stderr — ревизия для следующего '
+            'запуска')
+
+    def add_arguments(self, parser):
+        parser.add_argument('revision', type=int, nargs='?', default=0)
+        parser.add_argument('--batch-size', type=int, default=changes.LIMIT)
+
+    def handle(self, *args, **options):
+        revision = options['revision']
+        while True:
+            items, next_revision = changes.changes_since(
+                revision, options['batch_size'])
+            for item in items:
+                self.stdout.write(json.dumps(
+                    item, cls=DjangoJSONEncoder, ensure_ascii=False))
+            if next_revision == revision:
+                break
+            revision = next_revision
+        self.stderr.write(str(revision))
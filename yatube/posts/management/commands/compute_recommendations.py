@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import recommendations
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рекомендации «Кого почитать» по графу подписок; '
+            'запускается периодически, например по cron')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int,
+                            default=settings.RECOMMENDATIONS_PER_USER)
+        parser.add_argument('--authors', type=int,
+                            default=settings.RECOMMENDATION_AUTHORS,
+                            help='Сколько самых читаемых авторов учитывать')
+        parser.add_argument('--batch-size', type=int,
+                            default=settings.RECOMMENDATION_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        created = recommendations.compute(
+            top_n=options['top'], max_authors=options['authors'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write('Рекомендаций: {} за {:.1f} с'.format(
+            created, time.perf_counter() - started))
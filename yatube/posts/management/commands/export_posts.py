@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+from posts.forms import ExportForm
+
+
+class Command(BaseCommand):
+    help = ('Выгружает посты или комментарии в NDJSON или CSV потоком, '
+            'не загружая всю выборку в память')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', default='posts',
+                            choices=sorted(export.FIELDS))
+        parser.add_argument('--format', default='ndjson',
+                            choices=sorted(export.CONTENT_TYPES))
+        parser.add_argument('--author', help='Имя пользователя автора')
+        parser.add_argument('--group', help='slug группы')
+        parser.add_argument('--since', help='С даты, ГГГГ-ММ-ДД')
+        parser.add_argument('--until', help='По дату включительно')
+        parser.add_argument('--output', help='Файл; по умолчанию stdout')
+        parser.add_argument('--chunk-size', type=int,
+                            default=export.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        form = ExportForm({
+            name: options[name] for name in
+            ('kind', 'format', 'author', 'group', 'since', 'until')
+            if options[name] is not None
+        })
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+        params = form.cleaned_data
+        rows = export.queryset(
+            params['kind'], author=params['author'], group=params['group'],
+            since=params['since'], until=params['until'],
+        )
+        lines = export.lines(params['kind'], rows, params['format'],
+                             chunk_size=options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8',
+                      newline='') as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,49 @@
+import os
+from functools import partial
+
+from django.core.management.base import BaseCommand
+
+from posts.importer import CHUNK_SIZE, Importer, read_records
+
+
+class Command(BaseCommand):
+    help = ('Массово загружает группы, посты или подписки из NDJSON/CSV '
+            'порциями с контрольными точками')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=['groups', 'posts', 'follows'])
+        parser.add_argument('path', help='Файл .ndjson или .csv')
+        parser.add_argument('--format', choices=['ndjson', 'csv'],
+                            help='По умолчанию — по расширению файла')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--create-authors', action='store_true',
+                            help='Создавать неизвестных авторов постов')
+        parser.add_argument('--restart', action='store_true',
+                            help='Начать сначала, забыв контрольную точку')
+
+    def progress(self, stats, rate):
+        self.stdout.write('{rows} записей, {rate:.0f} записей/с'.format(
+            rate=rate, **stats))
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options['path'])
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'ndjson')
+        importer = Importer(
+            options['kind'], path,
+            chunk_size=options['chunk_size'],
+            create_authors=options['create_authors'],
+        )
+        stats = importer.run(
+            partial(read_records, path, file_format),
+            restart=options['restart'],
+            progress=self.progress,
+        )
+        self.stdout.write('Пересчитываю счётчики и ленты...')
+        importer.finish()
+        self.stdout.write(self.style.SUCCESS(
+            'Готово: прочитано {rows}, записано {created}, пропущено '
+            '{skipped} за {seconds:.1f} с ({rate:.0f} записей/с); '
+            'позиция в файле {position}'.format(
+                rate=stats['rows'] / max(stats['seconds'], 1e-9), **stats)
+        ))
@@ -0,0 +1,175 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                 SESSION_KEY)
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post, User
+
+# Доля запросов каждой страницы в нагрузке по умолчанию
+MIX = {
+    'index': 30,
+    'post_detail': 25,
+    'profile': 15,
+    'group': 10,
+    'follow_index': 15,
+    'search': 5,
+}
+
+WORDS = ('пост', 'синтетический', 'группа', 'кот', 'комментарий')
+
+
+def percentile(values, share):
+    """Перцентиль по ближайшему рангу для отсортированного списка."""
+    if not values:
+        return 0
+    index = max(0, min(len(values) - 1, round(share * len(values)) - 1))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = ('Нагружает WSGI-приложение yatube.wsgi параллельными клиентами '
+            'и печатает пропускную способность и p50/p95/p99 '
+            'по именам URL из posts.urls')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=8,
+                            help='Число параллельных клиентов')
+        parser.add_argument('--requests', type=int, default=2000,
+                            help='Всего запросов')
+        parser.add_argument('--warmup', type=int, default=100,
+                            help='Запросов до начала замеров')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--only', nargs='*', choices=sorted(MIX),
+                            help='Нагружать только эти страницы')
+
+    def session_cookie(self, user):
+        """Cookie сессии, как после входа пользователя."""
+        engine = import_module(settings.SESSION_ENGINE)
+        session = engine.SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        return '{}={}'.format(settings.SESSION_COOKIE_NAME,
+                              session.session_key)
+
+    def targets(self, rng, sample=200):
+        """Случайные адреса для каждой страницы из реальных данных."""
+        def pick(queryset, size=sample):
+            values = list(queryset)
+            return rng.sample(values, min(size, len(values)))
+
+        post_ids = pick(Post.objects.order_by('id').values_list(
+            'id', flat=True))
+        if not post_ids:
+            raise CommandError('В базе нет постов, запустите seed_data')
+        usernames = pick(User.objects.filter(
+            stats__posts_count__gt=0).order_by('id').values_list(
+            'username', flat=True))
+        slugs = pick(Group.objects.order_by('id').values_list(
+            'slug', flat=True))
+        readers = pick(User.objects.filter(
+            id__in=Follow.objects.values('user_id')).order_by('id'), 20)
+        cookies = [self.session_cookie(user) for user in readers]
+        targets = {
+            'index': lambda: (reverse('posts:index'), None),
+            'post_detail': lambda: (reverse(
+                'posts:post_detail', args=[rng.choice(post_ids)]), None),
+            'profile': lambda: (reverse(
+                'posts:profile', args=[rng.choice(usernames)]), None),
+            'group': lambda: (reverse(
+                'posts:group', args=[rng.choice(slugs)]), None),
+            'follow_index': lambda: (reverse('posts:follow_index'),
+                                     rng.choice(cookies)),
+            'search': lambda: (reverse('posts:search') + '?' + urlencode(
+                {'q': rng.choice(WORDS)}), None),
+        }
+        # Без групп или подписок эти страницы нагружать нечем
+        if not slugs:
+            del targets['group']
+        if not cookies:
+            del targets['follow_index']
+        return targets
+
+    def call(self, application, path, cookie):
+        path, _, query = path.partition('?')
+        environ = {
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'HTTP_HOST': 'localhost',
+            # Не из INTERNAL_IPS, чтобы не подключался debug_toolbar
+            'REMOTE_ADDR': '10.0.0.1',
+        }
+        if cookie:
+            environ['HTTP_COOKIE'] = cookie
+        setup_testing_defaults(environ)
+        status = []
+        started = time.perf_counter()
+        response = application(
+            environ, lambda code, headers, exc_info=None: status.append(code)
+        )
+        try:
+            for _ in response:
+                pass
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+        return time.perf_counter() - started, status[0]
+
+    def handle(self, *args, **options):
+        from yatube.wsgi import application
+
+        rng = random.Random(options['seed'])
+        targets = self.targets(rng)
+        mix = {name: weight for name, weight in MIX.items()
+               if name in targets
+               and (not options['only'] or name in options['only'])}
+        names = rng.choices(
+            list(mix), list(mix.values()),
+            k=options['warmup'] + options['requests']
+        )
+        plan = [(name,) + targets[name]() for name in names]
+        # Соединение основного потока не нужно рабочим потокам
+        connection.close()
+        latencies = {name: [] for name in mix}
+        errors = {name: 0 for name in mix}
+
+        def worker(job):
+            name, path, cookie = job
+            elapsed, status = self.call(application, path, cookie)
+            return name, elapsed, status
+
+        with ThreadPoolExecutor(max_workers=options['clients']) as pool:
+            list(pool.map(worker, plan[:options['warmup']]))
+            started = time.perf_counter()
+            for name, elapsed, status in pool.map(
+                    worker, plan[options['warmup']:]):
+                latencies[name].append(elapsed * 1000)
+                if not status.startswith(('2', '3')):
+                    errors[name] += 1
+            total = time.perf_counter() - started
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            '{} запросов, {} клиентов: {:.1f} запросов/с'.format(
+                options['requests'], options['clients'],
+                options['requests'] / total)
+        ))
+        self.stdout.write('{:<14}{:>8}{:>10}{:>10}{:>10}{:>8}'.format(
+            'страница', 'запросов', 'p50, мс', 'p95, мс', 'p99, мс',
+            'ошибок'))
+        for name in mix:
+            values = sorted(latencies[name])
+            self.stdout.write(
+                '{:<14}{:>8}{:>10.1f}{:>10.1f}{:>10.1f}{:>8}'.format(
+                    name, len(values), percentile(values, 0.5),
+                    percentile(values, 0.95), percentile(values, 0.99),
+                    errors[name])
+            )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов и комментариев и чинит расхождения'
+
+    def handle(self, *args, **options):
+        repaired = counters.repair()
+        self.stdout.write(
+            'Создано счётчиков авторов: {created}\n'
+            'Исправлено авторов: {authors}, групп: {groups}, '
+            'постов: {posts}'.format(**repaired)
+        )
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import dataset
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class Command(BaseCommand):
+    help = ('Наполняет базу воспроизводимым синтетическим набором данных: '
+            'пользователи, группы, посты с картинками, комментарии, '
+            'подписки')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Тот же seed — те же данные')
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=50000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument('--follows', type=int, default=10,
+                            help='Подписок на пользователя')
+        parser.add_argument('--alpha', type=float, default=1.2,
+                            help='Показатель степенного закона подписок')
+        parser.add_argument('--images', type=int, default=20,
+                            help='Сколько разных картинок сгенерировать')
+        parser.add_argument('--image-share', type=float, default=0.2,
+                            help='Доля постов с картинкой')
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней разбросать даты')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        dataset.seed(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['follows'],
+            days=options['days'],
+            seed=options['seed'],
+            images=options['images'],
+            image_share=options['image_share'],
+            alpha=options['alpha'],
+        )
+        self.stdout.write(
+            'Готово за {:.1f} с. В базе пользователей: {}, групп: {}, '
+            'постов: {}, комментариев: {}, подписок: {}'.format(
+                time.perf_counter() - started,
+                User.objects.count(), Group.objects.count(),
+                Post.objects.count(), Comment.objects.count(),
+                Follow.objects.count(),
+            )
+        )
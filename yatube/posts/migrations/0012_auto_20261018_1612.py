@@ -0,0 +1,58 @@
+# Generated by Django 2.2.16 on 2026-10-18 13:12
+
+from django.db import migrations
+
+GROUP_TITLE = (
+    "COALESCE((SELECT title FROM posts_group WHERE id = new.group_id), '')"
+)
+
+CREATE = [
+    "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+    "text, group_title, tokenize = 'unicode61 remove_diacritics 2')",
+    "INSERT INTO posts_post_fts (rowid, text, group_title) "
+    "SELECT p.id, p.text, COALESCE(g.title, '') FROM posts_post p "
+    "LEFT JOIN posts_group g ON g.id = p.group_id",
+    "CREATE TRIGGER posts_post_fts_insert AFTER INSERT ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts (rowid, text, group_title) "
+    "VALUES (new.id, new.text, " + GROUP_TITLE + "); END",
+    "CREATE TRIGGER posts_post_fts_update "
+    "AFTER UPDATE OF text, group_id ON posts_post BEGIN "
+    "DELETE FROM posts_post_fts WHERE rowid = old.id; "
+    "INSERT INTO posts_post_fts (rowid, text, group_title) "
+    "VALUES (new.id, new.text, " + GROUP_TITLE + "); END",
+    "CREATE TRIGGER posts_post_fts_delete AFTER DELETE ON posts_post BEGIN "
+    "DELETE FROM posts_post_fts WHERE rowid = old.id; END",
+    "CREATE TRIGGER posts_group_fts_update "
+    "AFTER UPDATE OF title ON posts_group BEGIN "
+    "UPDATE posts_post_fts SET group_title = new.title WHERE rowid IN "
+    "(SELECT id FROM posts_post WHERE group_id = new.id); END",
+]
+
+DROP = [
+    "DROP TRIGGER IF EXISTS posts_group_fts_update",
+    "DROP TRIGGER IF EXISTS posts_post_fts_delete",
+    "DROP TRIGGER IF EXISTS posts_post_fts_update",
+    "DROP TRIGGER IF EXISTS posts_post_fts_insert",
+    "DROP TABLE IF EXISTS posts_post_fts",
+]
+
+
+def run_on_sqlite(statements):
+    # Индекс FTS5 есть только в SQLite, на других базах поиск
+    # работает через icontains (см. posts/search.py)
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'sqlite':
+            for statement in statements:
+                schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_auto_20261018_1605'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_sqlite(CREATE), run_on_sqlite(DROP)),
+    ]
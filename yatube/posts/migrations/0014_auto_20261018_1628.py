@@ -0,0 +1,120 @@
+# Generated by Django 2.2.16 on 2026-10-18 13:28
+
+from django.db import migrations, models
+
+# SQLite пересоздаёт таблицу при добавлении полей, а триггеры поискового
+# индекса из 0012 ссылаются на posts_post: снимаем их и ставим заново
+GROUP_TITLE = (
+    "COALESCE((SELECT title FROM posts_group WHERE id = new.group_id), '')"
+)
+
+CREATE_TRIGGERS = [
+    "CREATE TRIGGER posts_post_fts_insert AFTER INSERT ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts (rowid, text, group_title) "
+    "VALUES (new.id, new.text, " + GROUP_TITLE + "); END",
+    "CREATE TRIGGER posts_post_fts_update "
+    "AFTER UPDATE OF text, group_id ON posts_post BEGIN "
+    "DELETE FROM posts_post_fts WHERE rowid = old.id; "
+    "INSERT INTO posts_post_fts (rowid, text, group_title) "
+    "VALUES (new.id, new.text, " + GROUP_TITLE + "); END",
+    "CREATE TRIGGER posts_post_fts_delete AFTER DELETE ON posts_post BEGIN "
+    "DELETE FROM posts_post_fts WHERE rowid = old.id; END",
+    "CREATE TRIGGER posts_group_fts_update "
+    "AFTER UPDATE OF title ON posts_group BEGIN "
+    "UPDATE posts_post_fts SET group_title = new.title WHERE rowid IN "
+    "(SELECT id FROM posts_post WHERE group_id = new.id); END",
+]
+
+DROP_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS posts_group_fts_update",
+    "DROP TRIGGER IF EXISTS posts_post_fts_delete",
+    "DROP TRIGGER IF EXISTS posts_post_fts_update",
+    "DROP TRIGGER IF EXISTS posts_post_fts_insert",
+]
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'sqlite':
+            for statement in statements:
+                schema_editor.execute(statement)
+    return run
+
+
+# (тип в журнале, таблица, поле с датой создания)
+TRACKED = (
+    ('post', 'posts_post', 'pub_date'),
+    ('comment', 'posts_comment', 'created'),
+)
+
+
+def journal_existing(apps, schema_editor):
+    # Каждая существующая запись попадает в журнал, чтобы синхронизация
+    # с ревизии 0 получила всё; дата изменения — дата создания
+    for kind, table, created in TRACKED:
+        schema_editor.execute(
+            'INSERT INTO posts_change (kind, object_id, deleted, created) '
+            'SELECT %s, id, %s, {created} FROM {table} ORDER BY id'.format(
+                created=created, table=table),
+            [kind, False],
+        )
+        schema_editor.execute(
+            'UPDATE {table} SET modified = {created}, revision = ('
+            'SELECT MAX(c.id) FROM posts_change c '
+            'WHERE c.kind = %s AND c.object_id = {table}.id)'.format(
+                created=created, table=table),
+            [kind],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_importcheckpoint'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_sqlite(DROP_TRIGGERS),
+                             run_on_sqlite(CREATE_TRIGGERS)),
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'Пост'), ('comment', 'Комментарий')], max_length=10, verbose_name='Тип объекта')),
+                ('object_id', models.PositiveIntegerField(verbose_name='id объекта')),
+                ('deleted', models.BooleanField(default=False, verbose_name='Удалён')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Время изменения')),
+            ],
+            options={
+                'verbose_name': 'Изменение',
+                'verbose_name_plural': 'Журнал изменений',
+            },
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата изменения'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='revision',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False, verbose_name='Ревизия'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата изменения'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='revision',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False, verbose_name='Ревизия'),
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['kind', 'object_id'], name='change_kind_object_idx'),
+        ),
+        migrations.RunPython(run_on_sqlite(CREATE_TRIGGERS),
+                             run_on_sqlite(DROP_TRIGGERS)),
+        migrations.RunPython(journal_existing, migrations.RunPython.noop),
+    ]
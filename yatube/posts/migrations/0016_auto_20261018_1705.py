@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_auto_20261018_1640'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importcheckpoint',
+            name='first_id',
+            field=models.BigIntegerField(default=0, verbose_name='Последний id до начала импорта'),
+        ),
+        migrations.AddField(
+            model_name='importcheckpoint',
+            name='offset',
+            field=models.BigIntegerField(default=0, verbose_name='Байтовое смещение в файле'),
+        ),
+    ]
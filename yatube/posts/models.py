@@ -27,11 +27,43 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    # False — пост не рассылался по лентам подписчиков (у автора слишком
+    # много подписчиков), лента подписок подтягивает такие посты сама
+    fanned_out = models.BooleanField(
+        default=True,
+        editable=False,
+        verbose_name='Разослан подписчикам'
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число комментариев'
+    )
+    modified = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name='Дата изменения'
+    )
+    # Номер последней записи журнала Change об этом объекте
+    revision = models.BigIntegerField(
+        default=0,
+        db_index=True,
+        editable=False,
+        verbose_name='Ревизия'
+    )
 
     class Meta:
-        ordering = ["-pub_date"]
+        ordering = ["-pub_date", "-id"]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_id_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -45,6 +77,11 @@ class Group(models.Model):
     description = models.TextField(
         verbose_name='Подробное описание группы'
     )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число постов'
+    )
 
     def __str__(self):
         return self.title
@@ -68,6 +105,24 @@ class Comment(models.Model):
     text = models.TextField(verbose_name='Текст комментария')
     created = models.DateTimeField(
         auto_now_add=True, verbose_name='Дата публикации комментария')
+    modified = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name='Дата изменения'
+    )
+    # Номер последней записи журнала Change об этом объекте
+    revision = models.BigIntegerField(
+        default=0,
+        db_index=True,
+        editable=False,
+        verbose_name='Ревизия'
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -96,3 +151,163 @@ class Follow(models.Model):
             UniqueConstraint(fields=['user', 'author'],
                              name='unique_following'),
         ]
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user_idx'),
+        ]
+
+
+class AuthorStats(models.Model):
+    """Денормализованные счётчики автора."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Автор'
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число постов'
+    )
+
+    class Meta:
+        verbose_name = 'Счётчики автора'
+        verbose_name_plural = 'Счётчики авторов'
+
+    def __str__(self):
+        return str(self.posts_count)
+
+
+class TimelineEntry(models.Model):
+    """Материализованная лента подписок: строка на пару читатель–пост."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации поста')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            UniqueConstraint(fields=['user', 'post'],
+                             name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='timeline_user_pub_post_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='timeline_user_author_idx'),
+        ]
+
+
+class Recommendation(models.Model):
+    """Кого почитать: автор, предложенный пользователю пакетным расчётом."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommendations',
+        verbose_name='Читатель'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    score = models.FloatField(verbose_name='Оценка')
+    rank = models.PositiveSmallIntegerField(verbose_name='Место')
+    computed = models.DateTimeField(verbose_name='Рассчитано')
+
+    class Meta:
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+        constraints = [
+            UniqueConstraint(fields=['user', 'author'],
+                             name='unique_recommendation'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'rank'],
+                         name='recommendation_user_rank_idx'),
+            models.Index(fields=['computed'],
+                         name='recommendation_computed_idx'),
+        ]
+
+
+class ImportCheckpoint(models.Model):
+    """Сколько записей источника уже загружено командой import_content."""
+    source = models.CharField(
+        max_length=500,
+        unique=True,
+        verbose_name='Источник'
+    )
+    position = models.BigIntegerField(
+        default=0,
+        verbose_name='Загружено записей'
+    )
+    offset = models.BigIntegerField(
+        default=0,
+        verbose_name='Байтовое смещение в файле'
+    )
+    first_id = models.BigIntegerField(
+        default=0,
+        verbose_name='Последний id до начала импорта'
+    )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Обновлено'
+    )
+
+    class Meta:
+        verbose_name = 'Контрольная точка импорта'
+        verbose_name_plural = 'Контрольные точки импорта'
+
+    def __str__(self):
+        return '{}: {}'.format(self.source, self.position)
+
+
+class Change(models.Model):
+    """Журнал изменений постов и комментариев.
+
+    id записи — монотонно растущий номер ревизии; удаления остаются в
+    журнале записями с deleted=True.
+    """
+    KINDS = (
+        ('post', 'Пост'),
+        ('comment', 'Комментарий'),
+    )
+    kind = models.CharField(
+        max_length=10,
+        choices=KINDS,
+        verbose_name='Тип объекта'
+    )
+    object_id = models.PositiveIntegerField(verbose_name='id объекта')
+    deleted = models.BooleanField(default=False, verbose_name='Удалён')
+    created = models.DateTimeField(
+        auto_now_add=True, verbose_name='Время изменения')
+
+    class Meta:
+        verbose_name = 'Изменение'
+        verbose_name_plural = 'Журнал изменений'
+        indexes = [
+            models.Index(fields=['kind', 'object_id'],
+                         name='change_kind_object_idx'),
+        ]
+
+    def __str__(self):
+        return '{} {}'.format(self.kind, self.object_id)
@@ -0,0 +1,184 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+# Многоточие в окне номеров страниц
+ELLIPSIS = None
+
+# Целые в токене не шире 64-битного INTEGER базы
+INTEGER_LIMIT = 2 ** 63
+
+
+def encode_cursor(direction, values):
+    """Упаковывает направление и значения ключа в непрозрачный токен."""
+    raw = json.dumps([direction] + [
+        value.isoformat() if hasattr(value, 'isoformat') else value
+        for value in values
+    ], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен; для испорченного токена возвращает None."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, *values = json.loads(
+            base64.urlsafe_b64decode(padded.encode()).decode()
+        )
+    except (TypeError, ValueError):
+        return None
+    if direction not in (NEXT, PREVIOUS):
+        return None
+    return direction, values
+
+
+def page_window(number, num_pages, on_each_side=3, on_ends=1):
+    """Номера страниц вокруг текущей и по краям, пропуски — ELLIPSIS.
+
+    Для 200 000 страниц получается десяток ссылок, а не 200 000.
+    """
+    if num_pages <= (on_each_side + on_ends) * 2 + 1:
+        return list(range(1, num_pages + 1))
+    window = []
+    # Многоточие заменяет не меньше двух страниц: вместо одной
+    # пропущенной выгоднее показать её номер
+    if number > on_each_side + on_ends + 2:
+        window += list(range(1, on_ends + 1)) + [ELLIPSIS]
+        window += list(range(number - on_each_side, number + 1))
+    else:
+        window += list(range(1, number + 1))
+    if number < num_pages - on_each_side - on_ends - 1:
+        window += list(range(number + 1, number + on_each_side + 1))
+        window += [ELLIPSIS]
+        window += list(range(num_pages - on_ends + 1, num_pages + 1))
+    else:
+        window += list(range(number + 1, num_pages + 1))
+    return window
+
+
+class CursorPage:
+    """Страница курсорной пагинации: без номера и общего числа записей."""
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<CursorPage of {} objects>'.format(len(self.object_list))
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset-пагинация по составному ключу, по умолчанию (pub_date, id).
+
+    Вместо OFFSET страница выбирается условием «строго после ключа
+    последней записи», поэтому глубина прокрутки не влияет на скорость,
+    а COUNT(*) не выполняется вовсе.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id')):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = tuple(field.lstrip('-') for field in self.ordering)
+
+    def _parse(self, values):
+        if len(values) != len(self.fields):
+            raise ValueError
+        model = self.object_list.model
+        parsed = []
+        for field_name, value in zip(self.fields, values):
+            field = model._meta.get_field(field_name)
+            if field.get_internal_type() == 'DateTimeField':
+                if not isinstance(value, str):
+                    raise ValueError
+                value = parse_datetime(value)
+                if value is None:
+                    raise ValueError
+            else:
+                if isinstance(value, bool) or not isinstance(
+                        value, (str, int)):
+                    raise ValueError
+                value = field.to_python(value)
+                if isinstance(value, int) and abs(value) >= INTEGER_LIMIT:
+                    raise ValueError
+            parsed.append(value)
+        return parsed
+
+    def _after(self, values, reverse=False):
+        """Условие «после ключа» в порядке выдачи (или в обратном)."""
+        condition = Q()
+        for position in reversed(range(len(self.fields))):
+            field = self.fields[position]
+            descending = self.ordering[position].startswith('-')
+            lookup = 'lt' if descending != reverse else 'gt'
+            step = Q(**{'{}__{}'.format(field, lookup): values[position]})
+            if position < len(self.fields) - 1:
+                step |= Q(**{field: values[position]}) & condition
+            condition = step
+        return condition
+
+    def _key(self, obj):
+        return [getattr(obj, field) for field in self.fields]
+
+    def get_page(self, cursor):
+        """Возвращает страницу по токену; неверный токен даёт первую."""
+        decoded = decode_cursor(cursor) if cursor else None
+        direction, values = decoded or (NEXT, None)
+        if values is not None:
+            try:
+                values = self._parse(values)
+            except (TypeError, ValueError, LookupError, ValidationError):
+                direction, values = NEXT, None
+        queryset = self.object_list
+        if direction == PREVIOUS:
+            reversed_ordering = [
+                field[1:] if field.startswith('-') else '-' + field
+                for field in self.ordering
+            ]
+            queryset = queryset.filter(self._after(values, reverse=True))
+            rows = list(
+                queryset.order_by(*reversed_ordering)[:self.per_page + 1]
+            )
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            has_previous, has_next = has_more, True
+        else:
+            if values is not None:
+                queryset = queryset.filter(self._after(values))
+            rows = list(queryset.order_by(*self.ordering)[:self.per_page + 1])
+            has_next = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_previous = values is not None
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor(NEXT, self._key(rows[-1]))
+        if rows and has_previous:
+            previous_cursor = encode_cursor(PREVIOUS, self._key(rows[0]))
+        return CursorPage(rows, self, next_cursor, previous_cursor)
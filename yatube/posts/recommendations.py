@@ -0,0 +1,148 @@
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from . import feed_cache
+from .follow_cache import following_ids
+from .models import Follow, Post, Recommendation
+
+
+def _follow_edges():
+    """Все подписки массивом (n, 2): столбцы user_id и author_id."""
+    rows = Follow.objects.order_by().values_list('user_id', 'author_id')
+    edges = np.fromiter(
+        (value for row in rows.iterator(chunk_size=10000) for value in row),
+        dtype=np.int64,
+    )
+    return edges.reshape(-1, 2)
+
+
+def _activity(author_ids, days):
+    """Вес автора: 1 + log(1 + число постов за последние days дней)."""
+    since = timezone.now() - timedelta(days=days)
+    counts = dict(
+        Post.objects.filter(pub_date__gte=since).order_by().values(
+            'author_id').annotate(count=Count('id')).values_list(
+            'author_id', 'count')
+    )
+    posts = np.array([counts.get(int(author_id), 0)
+                      for author_id in author_ids], dtype=np.float32)
+    return 1 + np.log1p(posts)
+
+
+def _block(rows, columns, start, stop, size):
+    """Плотная матрица подписок пользователей [start, stop) на кандидатов.
+
+    rows отсортированы, поэтому порция — непрерывный срез рёбер.
+    """
+    low, high = np.searchsorted(rows, [start, stop])
+    block = np.zeros((stop - start, size), dtype=np.float32)
+    block[rows[low:high] - start, columns[low:high]] = 1
+    return block
+
+
+def compute(top_n=None, max_authors=None, batch_size=None,
+            activity_days=None):
+    """Пересчитывает рекомендации всех пользователей; возвращает их число.
+
+    Кандидаты — max_authors авторов с наибольшим числом подписчиков.
+    Сходство авторов — косинус по совместным подпискам (матрица
+    F^T F, считается порциями пользователей), оценка автора для
+    читателя — сумма сходств с авторами, на которых он подписан,
+    умноженная на вес недавней активности автора. Для каждого читателя
+    сохраняются top_n лучших авторов, на которых он ещё не подписан.
+    """
+    top_n = top_n or settings.RECOMMENDATIONS_PER_USER
+    max_authors = max_authors or settings.RECOMMENDATION_AUTHORS
+    batch_size = batch_size or settings.RECOMMENDATION_BATCH_SIZE
+    activity_days = activity_days or settings.RECOMMENDATION_ACTIVITY_DAYS
+    computed = timezone.now()
+    edges = _follow_edges()
+    if not len(edges):
+        Recommendation.objects.all().delete()
+        feed_cache.bump('recommendations')
+        return 0
+    user_ids, rows = np.unique(edges[:, 0], return_inverse=True)
+    author_ids, author_index = np.unique(edges[:, 1], return_inverse=True)
+    followers = np.bincount(author_index)
+    keep = np.argsort(-followers, kind='stable')[:max_authors]
+    candidates = author_ids[keep]
+    column = np.full(len(author_ids), -1)
+    column[keep] = np.arange(len(keep))
+    columns = column[author_index]
+    mask = columns >= 0
+    order = np.argsort(rows[mask], kind='stable')
+    rows, columns = rows[mask][order], columns[mask][order]
+    size = len(candidates)
+
+    cofollow = np.zeros((size, size), dtype=np.float32)
+    for start in range(0, len(user_ids), batch_size):
+        stop = min(start + batch_size, len(user_ids))
+        block = _block(rows, columns, start, stop, size)
+        cofollow += block.T @ block
+    norm = np.sqrt(np.diag(cofollow))
+    similarity = cofollow / np.outer(norm, norm)
+    np.fill_diagonal(similarity, 0)
+    similarity *= _activity(candidates, activity_days)[np.newaxis, :]
+
+    # Столбец кандидата для каждого читателя — чтобы не советовать себя
+    by_id = np.argsort(candidates)
+    position = np.searchsorted(candidates[by_id], user_ids)
+    position = np.minimum(position, size - 1)
+    self_column = np.where(candidates[by_id][position] == user_ids,
+                           by_id[position], -1)
+
+    created = 0
+    limit = min(top_n, size)
+    for start in range(0, len(user_ids), batch_size):
+        stop = min(start + batch_size, len(user_ids))
+        block = _block(rows, columns, start, stop, size)
+        scores = block @ similarity
+        scores[block > 0] = 0
+        own = self_column[start:stop]
+        scores[np.nonzero(own >= 0)[0], own[own >= 0]] = 0
+        best = np.argpartition(-scores, limit - 1, axis=1)[:, :limit]
+        best_scores = np.take_along_axis(scores, best, axis=1)
+        ranking = np.argsort(-best_scores, axis=1, kind='stable')
+        best = np.take_along_axis(best, ranking, axis=1)
+        best_scores = np.take_along_axis(best_scores, ranking, axis=1)
+        objects = [
+            Recommendation(
+                user_id=int(user_ids[start + offset]),
+                author_id=int(candidates[author]),
+                score=float(score), rank=rank, computed=computed,
+            )
+            for offset in range(stop - start)
+            for rank, (author, score) in enumerate(
+                zip(best[offset], best_scores[offset]))
+            if score > 0
+        ]
+        with transaction.atomic():
+            Recommendation.objects.filter(
+                user_id__in=[int(user_id) for user_id in
+                             user_ids[start:stop]]).delete()
+            Recommendation.objects.bulk_create(objects)
+        created += len(objects)
+    # Читатели, у которых больше нет подписок, остаются без рекомендаций
+    Recommendation.objects.filter(computed__lt=computed).delete()
+    feed_cache.bump('recommendations')
+    return created
+
+
+def for_user(user, limit=None):
+    """Авторы, которых стоит предложить user: один запрос по индексу.
+
+    Авторы, на которых он подписался после расчёта, отбрасываются по
+    кэшу подписок.
+    """
+    if not user.is_authenticated:
+        return []
+    following = following_ids(user)
+    rows = Recommendation.objects.filter(user_id=user.pk).select_related(
+        'author').order_by('rank')[:settings.RECOMMENDATIONS_PER_USER]
+    authors = [row.author for row in rows if row.author_id not in following]
+    return authors[:limit or settings.RECOMMENDATIONS_SHOWN]
@@ -0,0 +1,129 @@
+import re
+
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+from .pagination import (INTEGER_LIMIT, NEXT, PREVIOUS, CursorPage,
+                         CursorPaginator, decode_cursor, encode_cursor)
+
+TABLE = 'posts_post_fts'
+
+# Вес совпадения в тексте поста и в названии группы для bm25
+WEIGHTS = (1.0, 0.5)
+
+MATCH_SQL = 'SELECT rowid FROM {} WHERE {} MATCH %s'.format(TABLE, TABLE)
+
+RANKED_SQL = (
+    'SELECT id, score FROM ('
+    'SELECT rowid AS id, bm25({table}, {weights}) AS score '
+    'FROM {table} WHERE {table} MATCH %s'
+    ') WHERE {condition} ORDER BY {order} LIMIT %s'
+)
+
+
+def _connection():
+    return connections[router.db_for_read(Post)]
+
+
+def fts_available():
+    return _connection().vendor == 'sqlite'
+
+
+def match_expression(query):
+    """Запрос пользователя в синтаксисе FTS5: все слова, по префиксу.
+
+    Каждое слово берётся в кавычки, поэтому операторы FTS5 (NEAR, OR,
+    двоеточия и звёздочки) во вводе не работают и не ломают запрос.
+    """
+    words = re.findall(r'\w+', query)
+    return ' '.join('"{}"*'.format(word) for word in words)
+
+
+def filter_posts(queryset, query):
+    """Посты из queryset, найденные по запросу, без ранжирования."""
+    expression = match_expression(query)
+    if not expression:
+        return queryset.none()
+    if fts_available():
+        return queryset.filter(pk__in=RawSQL(MATCH_SQL, [expression]))
+    return queryset.filter(
+        Q(text__icontains=query) | Q(group__title__icontains=query)
+    )
+
+
+class SearchPaginator:
+    """Курсорная пагинация результатов поиска по ключу (ранг, id).
+
+    Лучшие совпадения первыми: bm25 в SQLite тем меньше, чем лучше,
+    при равном ранге новее пост с большим id.
+    """
+    is_cursor = True
+
+    def __init__(self, query, per_page, queryset=None):
+        self.query = query
+        self.per_page = int(per_page)
+        if queryset is None:
+            queryset = Post.objects.select_related('author', 'group')
+        self.queryset = queryset
+
+    def _ranked(self, expression, values, direction):
+        if values is None:
+            condition, params = '1', []
+        elif direction == NEXT:
+            condition = 'score > %s OR (score = %s AND id < %s)'
+            params = [values[0], values[0], values[1]]
+        else:
+            condition = 'score < %s OR (score = %s AND id > %s)'
+            params = [values[0], values[0], values[1]]
+        order = 'score, id DESC' if direction == NEXT else 'score DESC, id'
+        sql = RANKED_SQL.format(
+            table=TABLE,
+            weights=', '.join(str(weight) for weight in WEIGHTS),
+            condition=condition,
+            order=order,
+        )
+        with _connection().cursor() as cursor:
+            cursor.execute(
+                sql, [expression] + params + [self.per_page + 1]
+            )
+            return cursor.fetchall()
+
+    def get_page(self, cursor):
+        """Страница найденных постов; неверный токен даёт первую."""
+        if not fts_available():
+            return CursorPaginator(
+                filter_posts(self.queryset, self.query), self.per_page
+            ).get_page(cursor)
+        expression = match_expression(self.query)
+        if not expression:
+            return CursorPage([], self, None, None)
+        decoded = decode_cursor(cursor) if cursor else None
+        direction, values = decoded or (NEXT, None)
+        if values is not None:
+            try:
+                values = [float(values[0]), int(values[1])]
+                if abs(values[1]) >= INTEGER_LIMIT:
+                    raise ValueError
+            except (IndexError, TypeError, ValueError):
+                direction, values = NEXT, None
+        rows = self._ranked(expression, values, direction)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == PREVIOUS:
+            rows = rows[::-1]
+            has_previous, has_next = has_more, True
+        else:
+            has_previous, has_next = values is not None, has_more
+        posts = self.queryset.in_bulk([post_id for post_id, score in rows])
+        # Пост мог исчезнуть между запросами — его просто пропускаем
+        object_list = [
+            posts[post_id] for post_id, score in rows if post_id in posts
+        ]
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor(NEXT, rows[-1][::-1])
+        if rows and has_previous:
+            previous_cursor = encode_cursor(PREVIOUS, rows[0][::-1])
+        return CursorPage(object_list, self, next_cursor, previous_cursor)
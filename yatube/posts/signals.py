@@ -0,0 +1,122 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import changes, counters, feed_cache, follow_cache, timeline
+from .models import Comment, Follow, Group, Post, User
+
+# Поля пользователя, которые видны в карточках, ссылках и комментариях
+USER_DISPLAY_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, raw=False, **kwargs):
+    # Запоминаем прежнюю группу, чтобы перенести счётчик при правке поста
+    if not raw and not instance._state.adding:
+        instance._previous_group_id = Post.objects.filter(
+            pk=instance.pk).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    changes.record(instance)
+    if created:
+        counters.author_posts_changed(instance.author_id, 1)
+        counters.group_posts_changed(instance.group_id, 1)
+        timeline.fan_out(instance)
+        feed_cache.bump(*feed_cache.post_scopes(instance))
+        return
+    # Карточку не сбрасываем: в её ключ входит дата изменения
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    feed_cache.bump(*feed_cache.post_scopes(instance, previous_group_id))
+    if previous_group_id != instance.group_id:
+        counters.group_posts_changed(previous_group_id, -1)
+        counters.group_posts_changed(instance.group_id, 1)
+        instance._previous_group_id = instance.group_id
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    changes.record(instance, deleted=True)
+    counters.author_posts_changed(instance.author_id, -1)
+    counters.group_posts_changed(instance.group_id, -1)
+    feed_cache.evict_card(feed_cache.card_key(instance))
+    feed_cache.bump(*feed_cache.post_scopes(instance))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    changes.record(instance)
+    if created:
+        counters.post_comments_changed(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    changes.record(instance, deleted=True)
+    counters.post_comments_changed(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.backfill(instance.user_id, instance.author_id)
+        follow_cache.invalidate(instance.user_id)
+        feed_cache.bump('follow:{}'.format(instance.user_id))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    timeline.trim(instance.user_id, instance.author_id)
+    follow_cache.invalidate(instance.user_id)
+    feed_cache.bump('follow:{}'.format(instance.user_id))
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Вход сохраняет только last_login — прежние значения не нужны
+    if raw or instance._state.adding or (
+            update_fields is not None
+            and not set(update_fields) & set(USER_DISPLAY_FIELDS)):
+        return
+    instance._previous_display = User.objects.filter(
+        pk=instance.pk).values_list(*USER_DISPLAY_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_display', None)
+    if created or raw or previous is None:
+        return
+    instance._previous_display = None
+    current = tuple(getattr(instance, field) for field in USER_DISPLAY_FIELDS)
+    if current != previous:
+        # Имя и ссылка автора есть в любой ленте и на страницах постов
+        feed_cache.bump_all()
+
+
+@receiver(pre_save, sender=Group)
+def group_saving(sender, instance, raw=False, **kwargs):
+    if not raw and not instance._state.adding:
+        instance._previous_slug = Group.objects.filter(
+            pk=instance.pk).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    feed_cache.bump('group:{}'.format(instance.pk))
+    if getattr(instance, '_previous_slug', None) != instance.slug:
+        # Ссылка на группу есть в карточках всех её постов
+        feed_cache.bump_all()
+    instance._previous_slug = instance.slug
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    # Посты группы остаются без неё в обход сигналов Post
+    feed_cache.bump_all()
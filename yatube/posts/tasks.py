@@ -0,0 +1,13 @@
+from core import jobs
+
+from . import recommendations, thumbnails
+
+
+@jobs.task('posts.thumbnails')
+def make_thumbnails(name, scopes, card_key):
+    thumbnails.run_job(name, scopes, card_key)
+
+
+@jobs.task('posts.compute_recommendations')
+def compute_recommendations():
+    recommendations.compute()
@@ -0,0 +1,34 @@
+from functools import partial
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from posts.feed_cache import card_key, feed_generation
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts):
+    """HTML карточек постов страницы: одна выборка из кэша на всю страницу.
+
+    Отсутствующую карточку рендерит один процесс под блокировкой
+    cache.get_or_set; одна и та же карточка используется во всех лентах,
+    где встречается пост.
+    """
+    posts = list(posts)
+    generation = feed_generation()
+    keys = [card_key(post, generation) for post in posts]
+    cached = cache.get_many(keys)
+    cards = []
+    for post, key in zip(posts, keys):
+        card = cached.get(key)
+        if card is None:
+            card = cache.get_or_set(key, partial(
+                render_to_string, 'posts/includes/post_card.html',
+                {'post': post}), settings.FEED_CACHE_TIMEOUT)
+        cards.append(mark_safe(card))
+    return cards
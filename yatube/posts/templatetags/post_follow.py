@@ -0,0 +1,11 @@
+from django import template
+
+from posts.follow_cache import is_following
+
+register = template.Library()
+
+
+@register.filter
+def follows(user, author):
+    """{% if request.user|follows:author %} — без запроса к базе."""
+    return is_following(user, author)
@@ -0,0 +1,11 @@
+from django import template
+
+from posts.pagination import page_window
+
+register = template.Library()
+
+
+@register.filter
+def page_numbers(page_obj):
+    """Окно номеров страниц для навигации; None — многоточие."""
+    return page_window(page_obj.number, page_obj.paginator.num_pages)
@@ -0,0 +1,11 @@
+from django import template
+
+from posts.thumbnails import ready_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(post, geometry_string):
+    """Готовая миниатюра поста или None, пока она генерируется."""
+    return ready_thumbnail(post, geometry_string)
@@ -0,0 +1,22 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+from posts.models import Post
+
+
+class BenchmarkQueriesTests(TransactionTestCase):
+    # Команда снимает индексы в своей транзакции и закрывает соединение,
+    # поэтому тест идёт без обёртки TestCase
+
+    def test_smoke(self):
+        out = StringIO()
+        call_command('benchmark_queries', '--seed', '--users', '20',
+                     '--posts', '60', '--comments', '30', '--repeat', '1',
+                     stdout=out)
+        self.assertEqual(Post.objects.count(), 60)
+        output = out.getvalue()
+        for name in ('index', 'follow_index', 'post_detail, комментарии'):
+            self.assertIn('{}: '.format(name), output)
+        self.assertIn('после:', output)
@@ -0,0 +1,107 @@
+import json
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.changes import changes_since, latest_revision, record_bulk
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class ChangesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Author')
+        cls.staff = User.objects.create_user(username='Staff', is_staff=True)
+
+    def test_edit_updates_modified_and_revision(self):
+        post = Post.objects.create(text='Пост', author=self.author)
+        created_revision, created_modified = post.revision, post.modified
+        self.assertGreater(created_revision, 0)
+        post.text = 'Правка'
+        post.save()
+        post.refresh_from_db()
+        self.assertGreater(post.revision, created_revision)
+        self.assertGreater(post.modified, created_modified)
+        self.assertEqual(post.revision, latest_revision())
+
+    def test_changes_since_returns_latest_state_and_tombstones(self):
+        start = latest_revision()
+        post = Post.objects.create(text='Пост', author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.author, text='Комментарий')
+        post.text = 'Правка'
+        post.save()
+        comment_id = comment.pk
+        comment.delete()
+        items, next_revision = changes_since(start)
+        self.assertEqual(next_revision, latest_revision())
+        self.assertEqual(
+            [(item['kind'], item['id'], item['deleted']) for item in items],
+            [('post', post.pk, False), ('comment', comment_id, True)])
+        self.assertEqual(items[0]['text'], 'Правка')
+        self.assertEqual(changes_since(next_revision), ([], next_revision))
+        items, next_revision = changes_since(start, limit=1)
+        # Первая запись журнала устарела: пост правили позже
+        self.assertEqual(items, [])
+        self.assertEqual(next_revision, start + 1)
+
+    def test_bulk_created_objects_are_journaled(self):
+        start = latest_revision()
+        Post.objects.bulk_create(
+            [Post(text='Импорт {}'.format(i), author=self.author)
+             for i in range(3)])
+        self.assertEqual(changes_since(start), ([], start))
+        self.assertEqual(record_bulk(), 3)
+        self.assertEqual(record_bulk(), 0)
+        items, next_revision = changes_since(start)
+        self.assertEqual(sorted(item['text'] for item in items),
+                         ['Импорт 0', 'Импорт 1', 'Импорт 2'])
+        self.assertFalse(Post.objects.filter(revision=0).exists())
+        self.assertEqual(next_revision, latest_revision())
+
+    @mock.patch('posts.changes.BULK_CHUNK', 2)
+    def test_bulk_journal_is_chunked_by_id_range(self):
+        Post.objects.bulk_create(
+            [Post(text='Импорт {}'.format(i), author=self.author)
+             for i in range(5)])
+        # Границы id и по INSERT ... SELECT и UPDATE на каждый из трёх
+        # диапазонов (с точками сохранения), плюс границы комментариев
+        with self.assertNumQueries(1 + 3 * 4 + 1):
+            self.assertEqual(record_bulk(), 5)
+        revisions = list(Post.objects.values_list('revision', flat=True))
+        self.assertNotIn(0, revisions)
+        self.assertEqual(len(set(revisions)), 5)
+
+    def test_changes_endpoint(self):
+        post = Post.objects.create(text='Пост', author=self.author)
+        client = Client()
+        client.force_login(self.author)
+        url = reverse('posts:changes')
+        self.assertEqual(client.get(url).status_code, 302)
+        client.force_login(self.staff)
+        self.assertEqual(
+            client.get(url, {'since': 'x'}).status_code, 400)
+        data = json.loads(client.get(
+            url, {'since': post.revision - 1}).content)
+        self.assertEqual([item['id'] for item in data['changes']], [post.pk])
+        self.assertEqual(data['next'], post.revision)
+        self.assertFalse(data['has_more'])
+
+    def test_command(self):
+        start = latest_revision()
+        post = Post.objects.create(text='Пост', author=self.author)
+        post_id = post.pk
+        post.delete()
+        stdout, stderr = StringIO(), StringIO()
+        call_command('changes_since', str(start), '--batch-size', '1',
+                     stdout=stdout, stderr=stderr)
+        lines = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual(lines, [{'revision': start + 2, 'kind': 'post',
+                                  'id': post_id, 'deleted': True}])
+        self.assertEqual(stderr.getvalue().strip(), str(start + 2))
@@ -0,0 +1,73 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import AuthorStats, Comment, Group, Post
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Описание тестовой группы'
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Описание другой группы'
+        )
+
+    def counts(self, post=None):
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        result = {
+            'author': AuthorStats.objects.get(user=self.user).posts_count,
+            'group': self.group.posts_count,
+            'other_group': self.other_group.posts_count,
+        }
+        if post is not None:
+            post.refresh_from_db()
+            result['comments'] = post.comments_count
+        return result
+
+    def test_counters_follow_create_edit_and_delete(self):
+        post = Post.objects.create(text='Текст', author=self.user,
+                                   group=self.group)
+        Post.objects.create(text='Текст 2', author=self.user)
+        Comment.objects.create(post=post, author=self.user, text='Коммент')
+        self.assertEqual(self.counts(post), {
+            'author': 2, 'group': 1, 'other_group': 0, 'comments': 1
+        })
+        post.group = self.other_group
+        post.save()
+        self.assertEqual(self.counts(post), {
+            'author': 2, 'group': 0, 'other_group': 1, 'comments': 1
+        })
+        post.comments.get().delete()
+        self.assertEqual(self.counts(post)['comments'], 0)
+        post.delete()
+        self.assertEqual(self.counts(), {
+            'author': 1, 'group': 0, 'other_group': 0
+        })
+
+    def test_recount_command_repairs_drift(self):
+        post = Post.objects.create(text='Текст', author=self.user,
+                                   group=self.group)
+        Comment.objects.create(post=post, author=self.user, text='Коммент')
+        AuthorStats.objects.update(posts_count=10)
+        Group.objects.update(posts_count=7)
+        Post.objects.update(comments_count=0)
+        out = StringIO()
+        call_command('recount_counters', stdout=out)
+        self.assertEqual(self.counts(post), {
+            'author': 1, 'group': 1, 'other_group': 0, 'comments': 1
+        })
+        self.assertIn('групп: 2', out.getvalue())
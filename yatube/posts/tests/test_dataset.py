@@ -0,0 +1,40 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.db.models import Count
+from django.test import TestCase, override_settings
+
+from posts import dataset
+from posts.feed_cache import feed_generation
+from posts.models import (Change, Comment, Follow, Post, TimelineEntry,
+                          User)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_seed_builds_consistent_dataset(self):
+        version = feed_generation('index')
+        dataset.seed(users=40, groups=3, posts=300, comments=200,
+                     follows=5, images=2, image_share=0.5)
+        self.assertEqual(User.objects.count(), 40)
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Comment.objects.count(), 200)
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        self.assertEqual(Follow.objects.count(), 40 * 5)
+        followers = sorted(Follow.objects.values('author').annotate(
+            n=Count('id')).values_list('n', flat=True), reverse=True)
+        # Степенной закон: у самого популярного автора подписчиков
+        # заметно больше, чем у типичного
+        self.assertGreater(followers[0], 3 * followers[len(followers) // 2])
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertEqual(Change.objects.count(), 300 + 200)
+        self.assertFalse(Post.objects.filter(revision=0).exists())
+        self.assertNotEqual(feed_generation('index'), version)
@@ -0,0 +1,69 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Author')
+        cls.other = User.objects.create_user(username='Other')
+        cls.staff = User.objects.create_user(username='Staff', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='')
+        cls.post = Post.objects.create(
+            text='Пост автора', author=cls.author, group=cls.group)
+        old_post = Post.objects.create(text='Старый пост', author=cls.other)
+        Post.objects.filter(pk=old_post.pk).update(
+            pub_date=timezone.now() - timedelta(days=30))
+        Comment.objects.create(post=cls.post, author=cls.other, text='Да')
+
+    def export(self, **params):
+        client = Client()
+        client.force_login(self.staff)
+        response = client.get(reverse('posts:export'), params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_only_staff_can_export(self):
+        client = Client()
+        client.force_login(self.author)
+        response = client.get(reverse('posts:export'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_ndjson_with_filters(self):
+        rows = [json.loads(line) for line in self.export(
+            group='test-slug').splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['author'], 'Author')
+        self.assertEqual(rows[0]['comments_count'], 1)
+        since = (timezone.localdate() - timedelta(days=1)).isoformat()
+        self.assertEqual(len(self.export(since=since).splitlines()), 1)
+
+    def test_csv_comments(self):
+        lines = self.export(kind='comments', format='csv').splitlines()
+        self.assertEqual(lines[0], 'id,post_id,author,group,created,text')
+        self.assertIn('Other,test-slug', lines[1])
+
+    def test_bad_params(self):
+        client = Client()
+        client.force_login(self.staff)
+        response = client.get(reverse('posts:export'), {
+            'since': '2021-12-10', 'until': '2021-12-01'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('export_posts', author='Other', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([row['text'] for row in rows], ['Старый пост'])
@@ -1,5 +1,7 @@
+import io
 import shutil
 import tempfile
+from PIL import Image
 from django.contrib.auth import get_user_model
 from posts.models import Post
 from django.test import Client, TestCase, override_settings
@@ -59,6 +61,32 @@ class PostFormTests(TestCase):
         }))
         self.assertEqual(Post.objects.count(), count_post + 1)
 
+    @override_settings(IMAGE_INGEST_MAX_PIXELS=30000)
+    def test_uploaded_image_is_downscaled_rotated_and_stripped(self):
+        source = Image.new('RGB', (600, 200), 'blue')
+        exif = source.getexif()
+        exif[0x0112] = 6
+        exif[0x010F] = 'Камера'
+        buffer = io.BytesIO()
+        source.save(buffer, 'PNG', exif=exif.tobytes())
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Пост с большой картинкой',
+                'image': SimpleUploadedFile(
+                    name='photo.png',
+                    content=buffer.getvalue(),
+                    content_type='image/png')
+            },
+        )
+        post = Post.objects.get(text='Пост с большой картинкой')
+        self.assertTrue(post.image.name.endswith('photo.jpg'))
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.format, 'JPEG')
+            self.assertLessEqual(stored.width * stored.height, 30000)
+            self.assertGreater(stored.height, stored.width)
+            self.assertEqual(len(stored.getexif()), 0)
+
     def test_edit_post(self):
         form_data = {
             'text': 'измененный текст',
@@ -0,0 +1,35 @@
+import io
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from unittest import mock
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from posts import images
+
+
+def png(size):
+    output = io.BytesIO()
+    Image.new('RGB', size, 'red').save(output, 'PNG')
+    return SimpleUploadedFile('big.png', output.getvalue(), 'image/png')
+
+
+class IngestTests(SimpleTestCase):
+    @override_settings(IMAGE_INGEST_MAX_PIXELS=100,
+                       IMAGE_INGEST_FORMAT='JPEG')
+    def test_large_image_is_downscaled(self):
+        result = images.ingest(png((40, 10)))
+        self.assertEqual(result.name, 'big.jpg')
+        with Image.open(result) as image:
+            self.assertEqual(image.size, (20, 5))
+
+    def test_timeout_cancels_pending_work(self):
+        future = mock.Mock()
+        future.result.side_effect = FutureTimeoutError
+        with mock.patch.object(images, '_pool') as pool:
+            pool.return_value.submit.return_value = future
+            with self.assertRaises(ValidationError):
+                images.ingest(png((4, 4)))
+        future.cancel.assert_called_once_with()
@@ -0,0 +1,125 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.changes import changes_since
+from posts.importer import Importer, read_records
+from posts.models import (AuthorStats, Follow, Group, ImportCheckpoint,
+                          Post, TimelineEntry)
+
+User = get_user_model()
+
+
+class ImportTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as output:
+            output.write(content)
+        return path
+
+    def call(self, *args):
+        call_command('import_content', *args, stdout=StringIO())
+
+    def test_import_groups_posts_and_follows(self):
+        User.objects.create_user(username='reader')
+        self.call('groups', self.write(
+            'groups.csv', 'title,slug,description\nКоты,cats,Про котов\n'
+                          'Коты,cats,Дубль\n'))
+        self.call('posts', self.write('posts.ndjson', '\n'.join(
+            json.dumps(record, ensure_ascii=False) for record in [
+                {'author': 'writer', 'group': 'cats', 'text': 'Кот',
+                 'pub_date': '2020-01-02T03:04:05'},
+                {'author': 'writer', 'text': 'Без группы'},
+                {'author': 'writer', 'group': 'nope', 'text': 'Пропуск'},
+                {'author': 'ghost', 'text': 'Неизвестный автор'},
+            ]
+        )), '--chunk-size', '2')
+        self.assertEqual(Group.objects.count(), 1)
+        self.assertEqual(Post.objects.count(), 0)
+        # Без --create-authors посты неизвестных авторов пропускаются
+        self.call('posts', self.write('posts2.ndjson', json.dumps(
+            {'author': 'writer', 'group': 'cats', 'text': 'Кот',
+             'pub_date': '2020-01-02T03:04:05'})), '--create-authors')
+        writer = User.objects.get(username='writer')
+        post = Post.objects.get()
+        self.assertEqual(post.pub_date.year, 2020)
+        self.assertEqual(AuthorStats.objects.get(user=writer).posts_count, 1)
+        self.assertEqual(
+            [item['id'] for item in changes_since(0)[0]], [post.id])
+        self.call('follows', self.write(
+            'follows.csv', 'user,author\nreader,writer\nreader,writer\n'))
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertTrue(TimelineEntry.objects.filter(post=post).exists())
+
+    def test_resume_from_checkpoint(self):
+        User.objects.create_user(username='writer')
+        records = [{'author': 'writer', 'text': str(i)} for i in range(5)]
+        # Точка без байтового смещения: записи пропускаются по счёту
+        ImportCheckpoint.objects.create(source='posts:file', position=3)
+        stats = Importer('posts', 'file', chunk_size=2).run(
+            lambda offset: ((record, 0) for record in records))
+        self.assertEqual(stats['rows'], 2)
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)), ['3', '4'])
+        self.assertEqual(
+            ImportCheckpoint.objects.get(source='posts:file').position, 5)
+
+    def test_resume_seeks_to_byte_offset(self):
+        User.objects.create_user(username='writer')
+        lines = [json.dumps({'author': 'writer', 'text': 'Пост {}'.format(i)},
+                            ensure_ascii=False) + '\n' for i in range(5)]
+        path = self.write('posts.ndjson', ''.join(lines))
+
+        def crashing(offset):
+            for number, item in enumerate(
+                    read_records(path, 'ndjson', offset)):
+                if number == 3:
+                    raise RuntimeError('Сбой посреди импорта')
+                yield item
+
+        with self.assertRaises(RuntimeError):
+            Importer('posts', path, chunk_size=2).run(crashing)
+        checkpoint = ImportCheckpoint.objects.get(source='posts:' + path)
+        self.assertEqual(checkpoint.position, 2)
+        self.assertEqual(checkpoint.offset, len(''.join(lines[:2]).encode()))
+        offsets = []
+
+        def read(offset):
+            offsets.append(offset)
+            return read_records(path, 'ndjson', offset)
+
+        stats = Importer('posts', path, chunk_size=2).run(read)
+        self.assertEqual(offsets, [checkpoint.offset])
+        self.assertEqual(stats['rows'], 3)
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            ['Пост {}'.format(i) for i in range(5)])
+
+    def test_csv_records_from_offset(self):
+        path = self.write('follows.csv', 'user,author\nа,б\n"в\nг",д\n')
+        records = list(read_records(path, 'csv'))
+        self.assertEqual([record for record, end in records], [
+            {'user': 'а', 'author': 'б'}, {'user': 'в\nг', 'author': 'д'}])
+        self.assertEqual(
+            [record for record, end in read_records(
+                path, 'csv', records[0][1])],
+            [{'user': 'в\nг', 'author': 'д'}])
+
+    def test_duplicates_are_not_counted_as_created(self):
+        User.objects.create_user(username='reader')
+        User.objects.create_user(username='writer')
+        stats = Importer('follows', 'file').run(lambda offset: iter([
+            ({'user': 'reader', 'author': 'writer'}, 1),
+            ({'user': 'reader', 'author': 'writer'}, 2),
+        ]))
+        self.assertEqual((stats['created'], stats['skipped']), (1, 1))
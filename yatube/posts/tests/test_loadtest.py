@@ -0,0 +1,22 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+from posts import dataset
+
+
+class LoadtestTests(TransactionTestCase):
+    # Рабочие потоки ходят в базу своими соединениями и должны видеть
+    # данные, поэтому без транзакции TestCase
+
+    def test_smoke(self):
+        dataset.seed(users=10, groups=2, posts=30, comments=10, follows=2)
+        out = StringIO()
+        call_command('loadtest', '--clients', '2', '--requests', '5',
+                     '--warmup', '1', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertIn('5 запросов, 2 клиентов', lines[0])
+        rows = [line.split() for line in lines[2:]]
+        self.assertEqual(sum(int(row[1]) for row in rows), 5)
+        self.assertEqual([row[-1] for row in rows], ['0'] * len(rows))
@@ -0,0 +1,173 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Post
+from posts.pagination import (ELLIPSIS, NEXT, CursorPaginator,
+                              decode_cursor, encode_cursor, page_window)
+
+User = get_user_model()
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        for i in range(25):
+            Post.objects.create(text='Тестовый текст' + str(i),
+                                author=cls.user)
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_pages_walk_forward_and_back(self):
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        first = paginator.get_page(None)
+        second = paginator.get_page(first.next_cursor)
+        third = paginator.get_page(second.next_cursor)
+        self.assertEqual(len(first), 10)
+        self.assertEqual(len(second), 10)
+        self.assertEqual(len(third), 5)
+        self.assertFalse(first.has_previous())
+        self.assertFalse(third.has_next())
+        seen = [post.id for page in (first, second, third) for post in page]
+        expected = list(
+            Post.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True)
+        )
+        self.assertEqual(seen, expected)
+        back = paginator.get_page(third.previous_cursor)
+        self.assertEqual([post.id for post in back],
+                         [post.id for post in second])
+        self.assertTrue(back.has_previous())
+
+    def test_broken_cursor_returns_first_page(self):
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        first = paginator.get_page(None)
+        for cursor in ('мусор', 'W10', 'WyJuIiwiZm9vIiwxXQ'):
+            with self.subTest(cursor=cursor):
+                page = paginator.get_page(cursor)
+                self.assertEqual(list(page), list(first))
+
+    def test_malformed_cursor_values_return_first_page(self):
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        first = paginator.get_page(None)
+        for values in ([5, 1], [None, None], ['2020-01-01T00:00:00', 'abc'],
+                       ['2020-01-01T00:00:00', [1]],
+                       ['2020-01-01T00:00:00', True],
+                       ['2020-01-01T00:00:00', 10 ** 30],
+                       ['2020-13-45T00:00:00', 1]):
+            with self.subTest(values=values):
+                page = paginator.get_page(encode_cursor(NEXT, values))
+                self.assertEqual(list(page), list(first))
+
+    def test_malformed_comment_cursor_returns_first_page(self):
+        post = Post.objects.first()
+        url = reverse('posts:comments', kwargs={'post_id': post.id})
+        response = self.guest_client.get(
+            url, {'cursor': encode_cursor(NEXT, [None, 'abc'])})
+        self.assertEqual(response.status_code, 200)
+
+    def test_cursor_is_opaque(self):
+        page = CursorPaginator(Post.objects.all(), 10).get_page(None)
+        self.assertNotIn('Тестовый', page.next_cursor)
+        self.assertEqual(decode_cursor(page.next_cursor)[0], 'n')
+
+    @override_settings(PAGINATION_MODE='cursor')
+    def test_views_use_cursor_mode(self):
+        response = self.guest_client.get(reverse('posts:index'))
+        page_obj = response.context['page_obj']
+        self.assertIsInstance(page_obj.paginator, CursorPaginator)
+        self.assertContains(response, '?cursor=' + page_obj.next_cursor)
+        response = self.guest_client.get(
+            reverse('posts:profile', kwargs={'username': 'TestUser'}),
+            {'cursor': page_obj.next_cursor}
+        )
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+
+@override_settings(COMMENTS_PER_PAGE=10)
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.post = Post.objects.create(text='Популярный пост',
+                                       author=cls.user)
+        for i in range(15):
+            Comment.objects.create(post=cls.post, author=cls.user,
+                                   text='Комментарий {}'.format(i))
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_comments_are_loaded_in_portions(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        response = self.guest_client.get(url)
+        comments = response.context['comments']
+        self.assertEqual(
+            [comment.text for comment in comments],
+            ['Комментарий {}'.format(i) for i in range(10)]
+        )
+        self.assertContains(response, reverse(
+            'posts:comments', kwargs={'post_id': self.post.id}))
+        response = self.guest_client.get(
+            reverse('posts:comments', kwargs={'post_id': self.post.id}),
+            {'cursor': comments.next_cursor}
+        )
+        self.assertEqual(len(response.context['comments']), 5)
+        self.assertContains(response, 'Комментарий 14')
+        self.assertNotContains(response, 'js-more-comments')
+
+    def test_comments_of_missing_post(self):
+        response = self.guest_client.get(
+            reverse('posts:comments', kwargs={'post_id': self.post.id + 1}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_newest_first(self):
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            {'order': 'newest'}
+        )
+        self.assertEqual(response.context['comments'][0].text,
+                         'Комментарий 14')
+
+
+class PageWindowTests(TestCase):
+    def test_short_range_is_shown_in_full(self):
+        self.assertEqual(page_window(2, 5), [1, 2, 3, 4, 5])
+
+    def test_long_range_is_elided(self):
+        self.assertEqual(
+            page_window(100, 200000),
+            [1, ELLIPSIS, 97, 98, 99, 100, 101, 102, 103, ELLIPSIS, 200000]
+        )
+        self.assertEqual(page_window(1, 200000),
+                         [1, 2, 3, 4, ELLIPSIS, 200000])
+        self.assertEqual(page_window(200000, 200000),
+                         [1, ELLIPSIS, 199997, 199998, 199999, 200000])
+
+    def test_single_page_is_not_elided(self):
+        self.assertEqual(page_window(6, 20),
+                         [1, 2, 3, 4, 5, 6, 7, 8, 9, ELLIPSIS, 20])
+        self.assertEqual(page_window(7, 20),
+                         [1, ELLIPSIS, 4, 5, 6, 7, 8, 9, 10, ELLIPSIS, 20])
+        self.assertEqual(page_window(15, 20),
+                         [1, ELLIPSIS, 12, 13, 14, 15, 16, 17, 18, 19, 20])
+        self.assertEqual(page_window(14, 20),
+                         [1, ELLIPSIS, 11, 12, 13, 14, 15, 16, 17, ELLIPSIS,
+                          20])
+
+    @override_settings(PAGINATE_BY=1)
+    def test_feed_renders_window(self):
+        user = User.objects.create_user(username='TestUser')
+        for i in range(30):
+            Post.objects.create(text='Текст' + str(i), author=user)
+        cache.clear()
+        response = Client().get(reverse('posts:index'), {'page': 15})
+        self.assertContains(response, '?page=12"')
+        self.assertNotContains(response, '?page=11"')
+        self.assertContains(response, '&hellip;', count=2)
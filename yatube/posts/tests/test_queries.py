@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Максимальное число запросов к БД на страницу, не зависящее от числа
+# постов на странице и комментариев к посту. Группа и профиль тратят
+# ещё один запрос на ETag (id по slug или имени пользователя), профиль
+# и лента подписок — на рекомендации, лента — и на подписки читателя
+# (на холодном кэше posts.follow_cache)
+QUERY_BUDGETS = {
+    'posts:index': 4,
+    'posts:group': 6,
+    'posts:profile': 8,
+    'posts:follow_index': 7,
+    'posts:post_detail': 5,
+}
+
+
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Описание тестовой группы'
+        )
+        cls.authors = [
+            User.objects.create_user(username='Author' + str(i),
+                                     first_name='Имя' + str(i))
+            for i in range(3)
+        ]
+        for author in cls.authors:
+            Follow.objects.create(user=cls.reader, author=author)
+        for i in range(30):
+            Post.objects.create(
+                text='Тестовый текст' + str(i),
+                author=cls.authors[i % 3],
+                group=cls.group if i % 2 else None,
+            )
+        cls.post = Post.objects.filter(group=cls.group).first()
+        for i in range(25):
+            Comment.objects.create(post=cls.post,
+                                   author=cls.authors[i % 3],
+                                   text='Комментарий' + str(i))
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def count_queries(self, name, kwargs=None):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(name, kwargs=kwargs))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def pages(self):
+        return {
+            'posts:index': None,
+            'posts:group': {'slug': 'test-slug'},
+            'posts:profile': {'username': 'Author0'},
+            'posts:follow_index': None,
+            'posts:post_detail': {'post_id': self.post.id},
+        }
+
+    def test_views_fit_query_budget(self):
+        for name, kwargs in self.pages().items():
+            with self.subTest(name=name):
+                self.assertLessEqual(self.count_queries(name, kwargs),
+                                     QUERY_BUDGETS[name])
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        for name, kwargs in self.pages().items():
+            with self.subTest(name=name):
+                with override_settings(PAGINATE_BY=2):
+                    small = self.count_queries(name, kwargs)
+                with override_settings(PAGINATE_BY=10):
+                    large = self.count_queries(name, kwargs)
+                self.assertEqual(small, large)
+
+    def test_query_count_does_not_depend_on_comment_count(self):
+        kwargs = {'post_id': self.post.id}
+        before = self.count_queries('posts:post_detail', kwargs)
+        Comment.objects.filter(
+            id__in=self.post.comments.values('id')[:20]
+        ).delete()
+        self.assertEqual(self.count_queries('posts:post_detail', kwargs),
+                         before)
@@ -0,0 +1,67 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Follow, Post, Recommendation
+from posts.recommendations import compute, for_user
+
+User = get_user_model()
+
+
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {
+            name: User.objects.create_user(username=name)
+            for name in ('reader', 'fan1', 'fan2', 'cats', 'dogs', 'quiet')
+        }
+        follows = {
+            'reader': ['cats'],
+            'fan1': ['cats', 'dogs', 'quiet'],
+            'fan2': ['cats', 'dogs', 'quiet'],
+        }
+        for user, authors in follows.items():
+            for author in authors:
+                Follow.objects.create(user=cls.users[user],
+                                      author=cls.users[author])
+        # Свежие посты поднимают автора выше равного ему по подпискам
+        for _ in range(3):
+            Post.objects.create(text='Гав', author=cls.users['dogs'])
+
+    def test_cofollow_ranking(self):
+        self.assertGreater(compute(), 0)
+        reader = self.users['reader']
+        ranked = list(Recommendation.objects.filter(user=reader).order_by(
+            'rank').values_list('author__username', flat=True))
+        self.assertEqual(ranked, ['dogs', 'quiet'])
+        self.assertEqual(
+            [author.username for author in for_user(reader)],
+            ['dogs', 'quiet'])
+        # Себя и тех, на кого уже подписан, не советуем
+        self.assertFalse(Recommendation.objects.filter(
+            user=self.users['fan1']).exists())
+
+    def test_follow_hides_recommendation_and_recompute_drops_stale(self):
+        compute()
+        reader = self.users['reader']
+        client = Client()
+        client.force_login(reader)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [author.username for author in response.context[
+                'recommendations']], ['dogs', 'quiet'])
+        client.get(reverse('posts:profile_follow',
+                           kwargs={'username': 'dogs'}))
+        response = client.get(reverse(
+            'posts:profile', kwargs={'username': 'cats'}))
+        self.assertEqual(
+            [author.username for author in response.context[
+                'recommendations']], ['quiet'])
+        Follow.objects.filter(user=reader).delete()
+        out = StringIO()
+        call_command('compute_recommendations', stdout=out)
+        self.assertIn('Рекомендаций:', out.getvalue())
+        self.assertFalse(Recommendation.objects.filter(user=reader).exists())
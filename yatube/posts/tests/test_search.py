@@ -0,0 +1,86 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post
+from posts.search import SearchPaginator, filter_posts, match_expression
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.group = Group.objects.create(
+            title='Котики',
+            slug='cats',
+            description='Тестовое описание',
+        )
+        cls.cat_post = Post.objects.create(
+            text='Кот спит на диване',
+            author=cls.user,
+        )
+        cls.dog_post = Post.objects.create(
+            text='Собака гуляет',
+            author=cls.user,
+            group=cls.group,
+        )
+
+    def search(self, query):
+        return set(filter_posts(Post.objects.all(), query))
+
+    def test_index_follows_posts_and_groups(self):
+        self.assertEqual(self.search('кот'), {self.cat_post})
+        self.assertEqual(self.search('котики'), {self.dog_post})
+        self.cat_post.text = 'Кошка спит'
+        self.cat_post.save()
+        self.group.title = 'Собачки'
+        self.group.save()
+        self.assertEqual(self.search('кот'), set())
+        self.assertEqual(self.search('собачки'), {self.dog_post})
+        self.dog_post.delete()
+        self.assertEqual(self.search('собака'), set())
+
+    def test_user_input_is_quoted(self):
+        self.assertEqual(
+            match_expression('кот OR "пёс*'), '"кот"* "OR"* "пёс"*'
+        )
+        self.assertEqual(self.search('NEAR( "'), set())
+
+    def test_cursor_pages_do_not_overlap(self):
+        posts = [
+            Post.objects.create(text='Кот {}'.format(i), author=self.user)
+            for i in range(5)
+        ]
+        paginator = SearchPaginator('кот', 4)
+        first = paginator.get_page(None)
+        second = paginator.get_page(first.next_cursor)
+        found = list(first) + list(second)
+        # Пост с собакой находится по названию группы «Котики»
+        self.assertEqual(len(found), 7)
+        self.assertEqual(
+            set(found), set(posts) | {self.cat_post, self.dog_post}
+        )
+        self.assertFalse(second.has_next())
+        previous = paginator.get_page(second.previous_cursor)
+        self.assertEqual(list(previous), list(first))
+
+    @override_settings(PAGINATE_BY=1)
+    def test_search_view_keeps_query_in_cursor_links(self):
+        response = Client().get(reverse('posts:search'), {'q': 'спит кот'})
+        self.assertEqual(list(response.context['page_obj']), [self.cat_post])
+        self.assertContains(response, 'Кот спит на диване')
+        response = Client().get(reverse('posts:search'), {'q': 'с'})
+        self.assertContains(response, '?q=%D1%81&amp;cursor=')
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'диване'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.cat_post]
+        )
@@ -0,0 +1,75 @@
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core import jobs
+from core.models import Job
+from posts.models import Post
+from posts.thumbnails import ready_thumbnail
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.post = cls.create_post('big.jpg')
+
+    @classmethod
+    def create_post(cls, name):
+        buffer = io.BytesIO()
+        Image.new('RGB', (1200, 800), 'red').save(buffer, 'JPEG')
+        return Post.objects.create(
+            text='Пост с картинкой',
+            author=cls.user,
+            image=SimpleUploadedFile(
+                name=name,
+                content=buffer.getvalue(),
+                content_type='image/jpeg'
+            )
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_placeholder_while_thumbnail_is_pending(self):
+        cache.set('thumbnail-pending:' + self.post.image.name, 1)
+        response = self.guest_client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.id}))
+        self.assertContains(response, 'bg-light')
+        self.assertNotContains(response, '/media/cache/')
+
+    def test_thumbnail_is_generated_and_rendered(self):
+        thumbnail = ready_thumbnail(self.post, '960x339')
+        self.assertIsNotNone(thumbnail)
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, thumbnail.url)
+
+    @override_settings(THUMBNAIL_PIPELINE_JOBS=True)
+    def test_thumbnail_job(self):
+        post = self.create_post('queued.jpg')
+        self.assertIsNone(ready_thumbnail(post, '960x339'))
+        job = Job.objects.get(name='posts.thumbnails')
+        self.assertEqual(jobs.claim('test'), [job.pk])
+        self.assertTrue(jobs.execute(job.pk))
+        self.assertIsNotNone(ready_thumbnail(post, '960x339'))
+        self.assertIsNone(cache.get('thumbnail-pending:' + post.image.name))
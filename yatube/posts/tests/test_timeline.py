@@ -0,0 +1,114 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import timeline
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.stranger = User.objects.create_user(username='Stranger')
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def feed(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return [post.text for post in response.context['page_obj']]
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='новый пост', author=self.author)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.stranger).exists())
+        self.assertEqual(self.feed(), ['новый пост'])
+
+    def test_follow_backfills_and_unfollow_trims(self):
+        Post.objects.create(text='старый пост', author=self.author)
+        self.reader_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': 'Author'}))
+        self.assertEqual(self.feed(), ['старый пост'])
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': 'Author'}))
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_popular_author_posts_are_pulled(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='пост звезды', author=self.author)
+        post.refresh_from_db()
+        self.assertFalse(post.fanned_out)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), ['пост звезды'])
+
+    @override_settings(TIMELINE_BACKFILL=2)
+    def test_rebuild_keeps_latest_posts_of_each_follow(self):
+        for i in range(3):
+            Post.objects.create(text='пост {}'.format(i), author=self.author)
+            Post.objects.create(text='чужой {}'.format(i),
+                                author=self.stranger)
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.stranger, author=self.author)
+        TimelineEntry.objects.all().delete()
+        # Удаление и одна вставка, плюс точка сохранения транзакции
+        with self.assertNumQueries(4):
+            timeline.rebuild([self.reader.pk])
+        self.assertEqual(self.feed(), ['пост 2', 'пост 1'])
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.stranger).exists())
+
+    def test_feed_checks_pulled_authors_without_queries(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        timeline.follow_feed(self.reader)
+        with self.assertNumQueries(0):
+            feed, ordering = timeline.follow_feed(self.reader)
+        self.assertIs(feed.model, TimelineEntry)
+        self.assertNotIn('fanned_out" = ', str(feed.query))
+        with override_settings(TIMELINE_FANOUT_LIMIT=0):
+            Post.objects.create(text='пост звезды', author=self.author)
+        feed, ordering = timeline.follow_feed(self.reader)
+        self.assertEqual(
+            [post.text for post in feed.order_by(*ordering)],
+            ['пост звезды'])
+
+    def test_feed_is_ordered_by_timeline_index(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        for i in range(3):
+            Post.objects.create(text='пост {}'.format(i), author=self.author)
+        feed, ordering = timeline.follow_feed(self.reader)
+        plan = feed.order_by(*ordering)[:10].explain()
+        self.assertIn('timeline_user_pub_post_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+        for mode in ('page', 'cursor'):
+            with self.subTest(mode=mode), self.settings(
+                    PAGINATION_MODE=mode):
+                self.assertEqual(self.feed(), ['пост 2', 'пост 1', 'пост 0'])
+        with self.settings(PAGINATION_MODE='cursor', PAGINATE_BY=2):
+            url = reverse('posts:follow_index')
+            page = self.reader_client.get(url).context['page_obj']
+            page = self.reader_client.get(
+                url, {'cursor': page.next_cursor}).context['page_obj']
+            self.assertEqual([post.text for post in page], ['пост 0'])
+
+    @override_settings(TIMELINE_BACKFILL=None)
+    def test_backfill_without_limit(self):
+        for i in range(3):
+            Post.objects.create(text='пост {}'.format(i), author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(len(self.feed()), 3)
+        TimelineEntry.objects.all().delete()
+        timeline.rebuild()
+        self.assertEqual(len(self.feed()), 3)
@@ -5,9 +5,12 @@ from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django import forms
 from django.conf import settings
-from posts.models import Follow, Post, Group
+from posts.models import Comment, Follow, Post, Group
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.utils.crypto import get_random_string
+from posts.feed_cache import card_key
+from posts.follow_cache import following_ids, is_following
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -230,16 +233,126 @@ class TaskPagesTests(TestCase):
         self.assertNotIn(first_object, response.context['page_obj'])
 
     def test_index_cache(self):
+        cache.clear()
         response_before = self.authorized_client.get(reverse('posts:index'))
+        Post.objects.filter(text='Тестовый текст14').update(
+            text='изменено мимо сигналов')
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertEqual(response_before.content, response.content)
         test_cache_post = Post.objects.create(
             text='test cache post',
             author=User.objects.get(username='TestUser'))
         response = self.authorized_client.get(reverse('posts:index'))
-        self.assertEqual(response_before.content, response.content)
-        self.assertNotContains(response, test_cache_post)
-        cache.clear()
-        response = self.authorized_client.get(reverse('posts:index'))
         self.assertContains(response, test_cache_post)
+        # Карточка поста кэшируется отдельно и сбрасывается при save()
+        post = Post.objects.get(text='изменено мимо сигналов')
+        post.text = 'изменено через save'
+        post.save()
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'изменено через save')
+
+    def test_index_cache_depends_on_page(self):
+        cache.clear()
+        first_page = self.authorized_client.get(reverse('posts:index'))
+        second_page = self.authorized_client.get(
+            reverse('posts:index') + '?page=2')
+        self.assertNotEqual(first_page.content, second_page.content)
+        self.assertContains(second_page, 'Тестовый текст0')
+
+    def test_post_card_is_shared_between_feeds(self):
+        cache.clear()
+        post = Post.objects.get(text='Тестовый текст14')
+        self.authorized_client.get(reverse('posts:index'))
+        self.assertIsNotNone(cache.get(card_key(post)))
+        cache.set(card_key(post), '<p>карточка из кэша</p>')
+        response = self.authorized_client.get(
+            reverse('posts:group', kwargs={'slug': 'test-slug'}))
+        self.assertContains(response, 'карточка из кэша')
+        post.save()
+        self.assertIsNone(cache.get(card_key(post)))
+
+    def test_conditional_get(self):
+        cache.clear()
+        post = Post.objects.get(text='Тестовый текст14')
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'TestUser'}),
+            reverse('posts:post_detail', kwargs={'post_id': post.id}),
+        ]
+        etags = {}
+        for url in urls:
+            etags[url] = self.authorized_client.get(url)['ETag']
+            response = self.authorized_client.get(
+                url, HTTP_IF_NONE_MATCH=etags[url])
+            self.assertEqual(response.status_code, 304, url)
+            # ETag у каждого пользователя свой
+            response = self.authorized_client_2.get(
+                url, HTTP_IF_NONE_MATCH=etags[url])
+            self.assertEqual(response.status_code, 200, url)
+        Comment.objects.create(post=post, author=self.user_2, text='Новый')
+        post.text = 'Изменённый текст'
+        post.save()
+        for url in urls:
+            response = self.authorized_client.get(
+                url, HTTP_IF_NONE_MATCH=etags[url])
+            self.assertEqual(response.status_code, 200, url)
+
+    def test_post_etag_follows_csrf_token(self):
+        url = reverse('posts:post_detail', kwargs={
+            'post_id': Post.objects.get(text='Тестовый текст14').id})
+        client = Client()
+        client.force_login(self.user)
+        etag = client.get(url)['ETag']
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # Токен меняется при входе — страницу с формой нужно отдать заново
+        client.cookies[settings.CSRF_COOKIE_NAME] = get_random_string(64)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_post_etag_follows_group_title(self):
+        post = Post.objects.filter(group__isnull=False).first()
+        url = reverse('posts:post_detail', kwargs={'post_id': post.id})
+        etag = self.authorized_client.get(url)['ETag']
+        group = post.group
+        group.title = 'Новое название'
+        group.save()
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Новое название')
+
+    def test_etag_follows_names_and_groups(self):
+        cache.clear()
+        group = Group.objects.get(slug='test-slug')
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group', kwargs={'slug': 'test-slug'}),
+        ]
+        etags = {url: self.authorized_client.get(url)['ETag']
+                 for url in urls}
+        # Вход сохраняет только last_login и ничего не меняет на страницах
+        self.user.save(update_fields=['last_login'])
+        for url in urls:
+            response = self.authorized_client.get(
+                url, HTTP_IF_NONE_MATCH=etags[url])
+            self.assertEqual(response.status_code, 304, url)
+        group.description = 'Новое описание'
+        group.save()
+        response = self.authorized_client.get(
+            urls[1], HTTP_IF_NONE_MATCH=etags[urls[1]])
+        self.assertContains(response, 'Новое описание')
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Переименованный'
+        user.save()
+        response = self.authorized_client.get(
+            urls[0], HTTP_IF_NONE_MATCH=etags[urls[0]])
+        self.assertContains(response, 'Переименованный')
+        # Новая ссылка на группу попадает и в закэшированные карточки
+        group.slug = 'new-slug'
+        group.save()
+        response = self.authorized_client.get(urls[0])
+        self.assertContains(response, reverse(
+            'posts:group', kwargs={'slug': 'new-slug'}))
 
     def test_follow_authorized(self):
         self.assertFalse(Follow.objects.filter(
@@ -262,6 +375,26 @@ class TaskPagesTests(TestCase):
         follow_after = Follow.objects.all().count()
         self.assertEqual(follow_after, follow_before - 1)
 
+    def test_follow_state_is_cached(self):
+        cache.clear()
+        user = User.objects.get(username='TestUser2')
+        self.assertFalse(is_following(user, self.user))
+        # Новый объект того же пользователя берёт множество из кэша
+        with self.assertNumQueries(0):
+            self.assertFalse(is_following(User(pk=user.pk), self.user.pk))
+        self.authorized_client_2.get(reverse(
+            'posts:profile_follow', kwargs={'username': 'TestUser'}))
+        self.assertEqual(following_ids(User.objects.get(pk=user.pk)),
+                         {self.user.pk})
+        response = self.authorized_client_2.get(reverse(
+            'posts:profile', kwargs={'username': 'TestUser'}))
+        self.assertContains(response, 'Отписаться')
+        self.authorized_client_2.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': 'TestUser'}))
+        response = self.authorized_client_2.get(reverse(
+            'posts:profile', kwargs={'username': 'TestUser'}))
+        self.assertContains(response, 'Подписаться')
+
     def test_new_post_is_exist_on_follow_index(self):
         Follow.objects.create(
             user=User.objects.get(username='TestUser2'),
@@ -0,0 +1,155 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from core import jobs
+
+from . import feed_cache
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class PipelineThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl, который умеет отвечать «миниатюра ещё не готова»."""
+
+    def thumbnail_name(self, file_, geometry_string, **options):
+        """Имя файла миниатюры — так же, как его вычисляет get_thumbnail."""
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return self._get_thumbnail_filename(source, geometry_string, options)
+
+    def get_ready_thumbnail(self, file_, geometry_string, **options):
+        """Готовая миниатюра или None; сама миниатюра не создаётся."""
+        name = self.thumbnail_name(file_, geometry_string, **options)
+        thumbnail = ImageFile(name, default.storage)
+        return thumbnail if thumbnail.exists() else None
+
+
+def geometry_options(geometry_string):
+    return dict(settings.THUMBNAIL_PIPELINE_GEOMETRIES[geometry_string])
+
+
+def generate(name):
+    """Создаёт миниатюры всех настроенных размеров для картинки."""
+    for geometry_string in settings.THUMBNAIL_PIPELINE_GEOMETRIES:
+        default.backend.get_thumbnail(
+            name, geometry_string, **geometry_options(geometry_string)
+        )
+
+
+def _init_worker():
+    # Дочерний процесс не должен пользоваться соединениями родителя
+    for conn in connections.all():
+        conn.connection = None
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.THUMBNAIL_PIPELINE_WORKERS,
+                mp_context=multiprocessing.get_context('fork'),
+                initializer=_init_worker,
+            )
+        return _executor
+
+
+def _pending_key(name):
+    return 'thumbnail-pending:' + name
+
+
+def _finished(name, scopes, card_key, future):
+    cache.delete(_pending_key(name))
+    error = future.exception()
+    if error is not None:
+        logger.warning('Не удалось создать миниатюры %s: %s', name, error)
+        return
+    # Миниатюры уже на диске: здесь sorl лишь запишет их в своё
+    # хранилище ключей
+    _refresh(name, scopes, card_key)
+
+
+def _refresh(name, scopes, card_key):
+    # Ленты и карточка с заглушкой вместо миниатюры перестроятся
+    generate(name)
+    feed_cache.evict_card(card_key)
+    feed_cache.bump(*scopes)
+
+
+def run_job(name, scopes, card_key):
+    """Задача очереди posts.thumbnails, см. posts/tasks.py.
+
+    При ошибке отметка «в очереди» остаётся до повтора задачи.
+    """
+    _refresh(name, scopes, card_key)
+    cache.delete(_pending_key(name))
+
+
+def _submit(name, scopes, card_key):
+    if not cache.add(_pending_key(name), 1,
+                     settings.THUMBNAIL_PIPELINE_TIMEOUT):
+        return
+    if settings.THUMBNAIL_PIPELINE_JOBS:
+        jobs.enqueue('posts.thumbnails', args=[name, scopes, card_key],
+                     priority=jobs.PRIORITY_LOW)
+        return
+    # Процессы не видят тестовую базу в памяти, там работаем синхронно
+    if (settings.THUMBNAIL_PIPELINE_WORKERS
+            and not connection.is_in_memory_db()):
+        future = _pool().submit(generate, name)
+        future.add_done_callback(
+            lambda done: _finished(name, scopes, card_key, done)
+        )
+        return
+    try:
+        generate(name)
+    except Exception as error:
+        logger.warning('Не удалось создать миниатюры %s: %s', name, error)
+    finally:
+        cache.delete(_pending_key(name))
+
+
+def schedule(post):
+    """Ставит в очередь миниатюры картинки поста после коммита."""
+    if post.image:
+        name, scopes = post.image.name, feed_cache.post_scopes(post)
+        card_key = feed_cache.card_key(post)
+        transaction.on_commit(lambda: _submit(name, scopes, card_key))
+
+
+def ready_thumbnail(post, geometry_string):
+    """Готовая миниатюра поста; если её нет — запускает генерацию."""
+    if not post.image:
+        return None
+    thumbnail = default.backend.get_ready_thumbnail(
+        post.image.name, geometry_string, **geometry_options(geometry_string)
+    )
+    if thumbnail is None:
+        _submit(post.image.name, feed_cache.post_scopes(post),
+                feed_cache.card_key(post))
+        thumbnail = default.backend.get_ready_thumbnail(
+            post.image.name, geometry_string,
+            **geometry_options(geometry_string)
+        )
+    return thumbnail
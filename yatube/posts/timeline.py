@@ -0,0 +1,156 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from django.db.models import Q
+
+from .follow_cache import following_ids
+from .models import Follow, Post, TimelineEntry
+
+PULLED_AUTHORS_KEY = 'timeline:pulled-authors'
+
+# Порядок ленты: по записям ленты и по постам, ключи совпадают
+ENTRY_ORDERING = ('-pub_date', '-post_id')
+POST_ORDERING = ('-pub_date', '-id')
+
+
+def pulled_authors():
+    """Авторы, чьи посты не рассылались, а подтягиваются при чтении.
+
+    Множество одно на всех читателей и лежит в кэше; fan_out сбрасывает
+    его, когда в нём появляется новый автор.
+    """
+    authors = cache.get(PULLED_AUTHORS_KEY)
+    if authors is None:
+        authors = frozenset(
+            Post.objects.filter(fanned_out=False).order_by().values_list(
+                'author_id', flat=True).distinct()
+        )
+        cache.set(PULLED_AUTHORS_KEY, authors, None)
+    return authors
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора.
+
+    Если подписчиков больше TIMELINE_FANOUT_LIMIT, пост не рассылается,
+    а помечается fanned_out=False и подтягивается лентой при чтении.
+    """
+    followers = Follow.objects.filter(author_id=post.author_id)
+    if followers.count() > settings.TIMELINE_FANOUT_LIMIT:
+        Post.objects.filter(pk=post.pk).update(fanned_out=False)
+        post.fanned_out = False
+        if post.author_id not in pulled_authors():
+            cache.delete(PULLED_AUTHORS_KEY)
+        return
+    batch = []
+    for user_id in followers.values_list('user_id', flat=True).iterator():
+        batch.append(TimelineEntry(user_id=user_id, post_id=post.pk,
+                                   author_id=post.author_id,
+                                   pub_date=post.pub_date))
+        if len(batch) >= settings.TIMELINE_BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту свежие посты автора при подписке.
+
+    Берутся TIMELINE_BACKFILL последних постов (None — все): более
+    старые посты в ленте подписок не появятся, они есть в профиле автора.
+    """
+    posts = Post.objects.filter(
+        author_id=author_id, fanned_out=True
+    ).values_list('id', 'pub_date')[:settings.TIMELINE_BACKFILL]
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post_id=post_id,
+                       author_id=author_id, pub_date=pub_date)
+         for post_id, pub_date in posts],
+        ignore_conflicts=True
+    )
+
+
+def trim(user_id, author_id):
+    """Убирает из ленты посты автора при отписке."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def follow_feed(user):
+    """Выборка ленты подписок пользователя и порядок для пагинатора.
+
+    Обычно это записи ленты читателя с постами через select_related:
+    порядок (-pub_date, -post_id) записи идёт по индексу
+    (user, -pub_date, -post) без сортировки во временном B-дереве.
+    Посты «популярных» авторов, которые не рассылались, добавляются
+    отдельной веткой по постам, только если читатель на таких авторов
+    подписан: это проверяется по кэшу подписок и pulled_authors,
+    без запроса.
+    """
+    authors = pulled_authors() & following_ids(user)
+    if not authors:
+        entries = TimelineEntry.objects.filter(user=user).select_related(
+            'post__author', 'post__group')
+        return entries, ENTRY_ORDERING
+    pushed = TimelineEntry.objects.filter(user=user).values('post_id')
+    posts = Post.objects.filter(
+        Q(pk__in=pushed) | Q(author_id__in=authors, fanned_out=False)
+    ).select_related('author', 'group')
+    return posts, POST_ORDERING
+
+
+def feed_posts(objects):
+    """Посты страницы ленты: записи ленты заменяются их постами."""
+    return [obj.post if isinstance(obj, TimelineEntry) else obj
+            for obj in objects]
+
+
+def fill(follows):
+    """Раскладывает по лентам последние посты авторов из подписок follows.
+
+    Один запрос INSERT ... SELECT: каждой подписке достаются
+    TIMELINE_BACKFILL последних постов автора, как при backfill;
+    уже имеющиеся записи ленты пропускаются.
+    """
+    limit = settings.TIMELINE_BACKFILL
+    using = router.db_for_write(TimelineEntry)
+    connection = connections[using]
+    ops = connection.ops
+    pairs, params = follows.order_by().values(
+        'user_id', 'author_id').query.get_compiler(using).as_sql()
+    sql = (
+        '{insert} {entries} (user_id, post_id, author_id, pub_date) '
+        'SELECT f.user_id, p.id, p.author_id, p.pub_date '
+        'FROM ({pairs}) f JOIN ('
+        'SELECT id, author_id, pub_date, ROW_NUMBER() OVER ('
+        'PARTITION BY author_id ORDER BY pub_date DESC, id DESC) AS number '
+        'FROM {posts} WHERE fanned_out '
+        'AND author_id IN (SELECT author_id FROM ({pairs}) a)'
+        ') p ON p.author_id = f.author_id '
+        '{limit} {suffix}'
+    ).format(
+        insert=ops.insert_statement(ignore_conflicts=True),
+        entries=ops.quote_name(TimelineEntry._meta.db_table),
+        posts=ops.quote_name(Post._meta.db_table),
+        pairs=pairs,
+        suffix=ops.ignore_conflicts_suffix_sql(ignore_conflicts=True),
+        limit='' if limit is None else 'WHERE p.number <= %s',
+    )
+    params = tuple(params) * 2 + (() if limit is None else (limit,))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def rebuild(user_ids=None):
+    """Пересобирает ленты с нуля (после массовой загрузки данных).
+
+    Удаление и заполнение идут в одной транзакции, так что ленты не
+    бывают пустыми посередине пересборки.
+    """
+    follows = Follow.objects.all()
+    entries = TimelineEntry.objects.all()
+    if user_ids is not None:
+        follows = follows.filter(user_id__in=user_ids)
+        entries = entries.filter(user_id__in=user_ids)
+    with transaction.atomic(using=router.db_for_write(TimelineEntry)):
+        entries.delete()
+        fill(follows)
@@ -1,68 +1,123 @@
+from urllib.parse import urlencode
+
 from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.http import (HttpResponseBadRequest, JsonResponse,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404, redirect, render
-
-from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-
-
-def paginator(request, post_list):
-    paginator = Paginator(post_list, settings.PAGINATE_BY)
+from django.views.decorators.http import condition
+
+from . import changes as post_changes
+from . import export as post_export
+from .forms import ChangesForm, CommentForm, ExportForm, PostForm
+from .models import Comment, Follow, Group, Post, User
+from .counters import author_posts_count
+from .etags import group_etag, index_etag, post_etag, profile_etag
+from .feed_cache import feed_cache_context
+from .pagination import CursorPaginator
+from .recommendations import for_user as recommended_authors
+from .search import SearchPaginator
+from .thumbnails import schedule as schedule_thumbnails
+from .timeline import feed_posts, follow_feed
+
+
+COMMENT_ORDERINGS = {
+    'oldest': ('created', 'id'),
+    'newest': ('-created', '-id'),
+}
+
+
+def paginator(request, post_list, ordering=Post._meta.ordering):
+    if settings.PAGINATION_MODE == 'cursor':
+        paginator = CursorPaginator(post_list, settings.PAGINATE_BY, ordering)
+        return paginator.get_page(request.GET.get('cursor'))
+    paginator = Paginator(post_list.order_by(*ordering), settings.PAGINATE_BY)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
 
 
+@condition(etag_func=index_etag)
 def index(request):
-    post_list = Post.objects.all()
+    post_list = Post.objects.select_related('author', 'group')
     page_obj = paginator(request, post_list)
     context = {
         'page_obj': page_obj,
+        **feed_cache_context(request, 'index'),
     }
     return render(request, 'posts/index.html', context)
 
 
+@condition(etag_func=group_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
+    post_list = group.posts.select_related('author', 'group')
     page_obj = paginator(request, post_list)
     context = {
         'group': group,
         'page_obj': page_obj,
+        **feed_cache_context(request, 'group:{}'.format(group.id)),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@condition(etag_func=profile_etag)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user, author=author).exists()
-    post_list = author.posts.all()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    post_list = author.posts.select_related('author', 'group')
     page_obj = paginator(request, post_list)
-    count_post = post_list.count()
+    count_post = author_posts_count(author)
     context = {'author': author,
                'count_post': count_post,
                'page_obj': page_obj,
-               'following': following,
+               'recommendations': recommended_authors(request.user),
+               **feed_cache_context(request, 'author:{}'.format(author.id)),
                }
     return render(request, 'posts/profile.html', context)
 
 
+def comments_page(request, post_id):
+    order = request.GET.get('order')
+    if order not in COMMENT_ORDERINGS:
+        order = 'oldest'
+    comments = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        settings.COMMENTS_PER_PAGE,
+        ordering=COMMENT_ORDERINGS[order],
+    ).get_page(request.GET.get('cursor'))
+    return {'comments': comments, 'order': order, 'post_id': post_id}
+
+
+@condition(etag_func=post_etag)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), id=post_id
+    )
     form = CommentForm(
         request.POST or None
     )
-    comments = post.comments.all()
     context = {
         'post': post,
         'form': form,
-        'comments': comments
+        **comments_page(request, post.id),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@condition(etag_func=post_etag)
+def comments(request, post_id):
+    """Следующая порция комментариев, подгружается со страницы поста."""
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    return render(
+        request, 'posts/includes/comments.html',
+        comments_page(request, post.id)
+    )
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -74,6 +129,7 @@ def post_create(request):
             post = form.save(commit=False)
             post.author = request.user
             form.save()
+            schedule_thumbnails(post)
             return redirect('posts:profile', request.user)
     context = {'form': form,
                }
@@ -94,7 +150,9 @@ def post_edit(request, post_id):
         if post.author != request.user:
             return redirect('posts:post_detail', post_id)
         if form.is_valid():
-            form.save()
+            post = form.save()
+            if 'image' in form.changed_data:
+                schedule_thumbnails(post)
             return redirect('posts:post_detail', post_id)
     return render(request, 'posts/create_post.html', context)
 
@@ -113,10 +171,15 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator(request, post_list)
+    post_list, ordering = follow_feed(request.user)
+    page_obj = paginator(request, post_list, ordering)
+    page_obj.object_list = feed_posts(page_obj.object_list)
     context = {
         'page_obj': page_obj,
+        'recommendations': recommended_authors(request.user),
+        **feed_cache_context(
+            request, 'index', 'follow:{}'.format(request.user.id)
+        ),
     }
     return render(request, 'posts/follow.html', context)
 
@@ -134,3 +197,59 @@ def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:index')
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        page_obj = SearchPaginator(query, settings.PAGINATE_BY).get_page(
+            request.GET.get('cursor')
+        )
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'cursor_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@staff_member_required
+def export(request):
+    """Потоковая выгрузка постов или комментариев в NDJSON или CSV."""
+    form = ExportForm({'kind': 'posts', 'format': 'ndjson',
+                       **request.GET.dict()})
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    options = form.cleaned_data
+    rows = post_export.queryset(
+        options['kind'], author=options['author'], group=options['group'],
+        since=options['since'], until=options['until'],
+    )
+    response = StreamingHttpResponse(
+        post_export.lines(options['kind'], rows, options['format']),
+        content_type=post_export.CONTENT_TYPES[options['format']],
+    )
+    response['Content-Disposition'] = 'attachment; filename="{}.{}"'.format(
+        options['kind'], options['format'])
+    return response
+
+
+@staff_member_required
+def changes(request):
+    """Изменения постов и комментариев после ревизии since, в JSON.
+
+    Клиент запрашивает страницы, передавая в since полученное next,
+    пока has_more не станет false.
+    """
+    form = ChangesForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    limit = form.cleaned_data['limit'] or post_changes.LIMIT
+    items, next_revision = post_changes.changes_since(
+        form.cleaned_data['since'] or 0, limit)
+    return JsonResponse({
+        'changes': items,
+        'next': next_revision,
+        'has_more': next_revision < post_changes.latest_revision(),
+    })
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+PREFIX = 'auth-user:'
+
+
+def user_cache_key(user_id):
+    return '{}{}'.format(PREFIX, user_id)
+
+
+def user_cache():
+    # Только общий кэш, без уровня в памяти процесса: сброс записи после
+    # смены пароля или is_active должен сразу дойти до всех воркеров
+    return caches[settings.USER_CACHE_ALIAS]
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который берёт пользователя сессии из кэша.
+
+    AuthenticationMiddleware загружает пользователя через get_user на
+    каждом запросе; кэш снимает этот запрос к auth_user. Запись
+    сбрасывается при сохранении пользователя (users.signals), так что
+    смена пароля по-прежнему завершает чужие сессии.
+    """
+
+    def get_user(self, user_id):
+        cache = user_cache()
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+        if not self.user_can_authenticate(user):
+            return None
+        return user
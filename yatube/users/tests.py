@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from users.backends import user_cache, user_cache_key
+
+User = get_user_model()
+
+
+class CachedSessionUserTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='Reader', password='old-password')
+        self.client = Client()
+        self.assertTrue(self.client.login(
+            username='Reader', password='old-password'))
+
+    def tables_read(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('about:author'))
+        self.assertEqual(response.status_code, 200)
+        return ' '.join(query['sql'] for query in queries)
+
+    def test_session_and_user_come_from_cache(self):
+        self.tables_read()
+        sql = self.tables_read()
+        self.assertNotIn('django_session', sql)
+        self.assertNotIn('auth_user', sql)
+        self.assertIsNotNone(user_cache().get(user_cache_key(self.user.pk)))
+
+    def test_profile_change_invalidates_cached_user(self):
+        self.tables_read()
+        self.user.first_name = 'Новое имя'
+        self.user.save()
+        self.assertIsNone(user_cache().get(user_cache_key(self.user.pk)))
+        response = self.client.get(reverse('about:author'))
+        self.assertEqual(response.wsgi_request.user.first_name, 'Новое имя')
+
+    def test_password_change_ends_session(self):
+        self.tables_read()
+        self.user.set_password('new-password')
+        self.user.save()
+        response = self.client.get(reverse('about:author'))
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+
+    def test_invalidation_from_another_process_is_seen_at_once(self):
+        self.tables_read()
+        self.assertFalse(any(
+            user_cache_key(self.user.pk) in key
+            for key in caches['default']._local))
+        # Другой воркер отключил пользователя и сбросил запись общего кэша
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        user_cache().delete(user_cache_key(self.user.pk))
+        response = self.client.get(reverse('about:author'))
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+
+    def test_session_of_plain_model_backend_survives(self):
+        client = Client()
+        client.force_login(
+            self.user, backend='django.contrib.auth.backends.ModelBackend')
+        response = client.get(reverse('about:author'))
+        self.assertTrue(response.wsgi_request.user.is_authenticated)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -28,10 +29,11 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
     'sorl.thumbnail',
-    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
+    'core.middleware.ReplicaStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -39,9 +41,42 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
+    'core.middleware.RateLimitMiddleware',
 ]
 
+# debug_toolbar только для разработки: под нагрузкой он слишком дорог,
+# в бою замеры снимает core.middleware.PerformanceMiddleware
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
+
+# Доля запросов, для которых снимаются замеры SQL, шаблонов и кэша
+PERFORMANCE_SAMPLE_RATE = float(os.getenv('PERFORMANCE_SAMPLE_RATE', 0.01))
+# Отдавать ли замеры клиенту в заголовке Server-Timing
+PERFORMANCE_SERVER_TIMING = bool(DEBUG)
+# Кэши, попадания и промахи которых считаются
+PERFORMANCE_CACHE_ALIASES = ['default']
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'yatube.performance': {
+            'handlers': ['console'],
+            'level': os.getenv('PERFORMANCE_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+        'yatube.jobs': {
+            'handlers': ['console'],
+            'level': os.getenv('JOBS_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES = [
@@ -63,6 +98,8 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+TEST_RUNNER = 'core.runner.TestRunner'
+
 
 DATABASES = {
     'default': {
@@ -71,6 +108,25 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения: пути к файлам SQLite через запятую.
+# Данные на них копирует внешняя репликация (локально — копия файла)
+DATABASE_REPLICAS = []
+for number, name in enumerate(filter(None, os.getenv(
+        'DATABASE_REPLICAS', '').split(',')), start=1):
+    alias = 'replica{}'.format(number)
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+# Сколько секунд после записи пользователь читает с основной базы,
+# чтобы увидеть своё изменение несмотря на отставание реплик
+REPLICA_STICKY_SECONDS = 10
+REPLICA_STICKY_COOKIE = 'read_primary'
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -107,17 +163,146 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Сессии читаются из кэша sessions, а в базу пишутся для надёжности и
+# читаются из неё только при промахе кэша (cached_db).
+# SESSION_ENGINE=django.contrib.sessions.backends.signed_cookies держит
+# сессию в подписанной cookie совсем без базы
+SESSION_ENGINE = os.getenv(
+    'SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+SESSION_CACHE_ALIAS = 'sessions'
+# Пользователь сессии тоже берётся из кэша, см. users/backends.py.
+# ModelBackend остаётся в списке для сессий, открытых до кэша: в них
+# записан его путь, и без него такие пользователи были бы разлогинены
+AUTHENTICATION_BACKENDS = [
+    'users.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+USER_CACHE_TIMEOUT = 60 * 15
+# Кэш пользователя сессии — общий, без уровня в памяти процесса
+USER_CACHE_ALIAS = 'shared'
+
+# Письма отправляются воркером очереди (manage.py run_jobs) бэкендом
+# JOBS_EMAIL_BACKEND, запрос только ставит их в очередь
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+JOBS_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 PAGINATE_BY = 10
+# Комментариев на странице поста и в каждой подгружаемой порции
+COMMENTS_PER_PAGE = 20
+# 'page' — классическая нумерация ?page=N,
+# 'cursor' — keyset-пагинация ?cursor=<токен> без COUNT(*) и OFFSET
+PAGINATION_MODE = os.getenv('PAGINATION_MODE', 'page')
+# Лента подписок: авторам с числом подписчиков больше лимита посты
+# не рассылаются, а подтягиваются при чтении
+TIMELINE_FANOUT_LIMIT = 10000
+TIMELINE_BATCH_SIZE = 1000
+# Сколько последних постов автора попадает в ленту при подписке и при
+# пересборке лент (None — все). Более старые посты в ленте подписок не
+# видны, только в профиле автора
+TIMELINE_BACKFILL = 200
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Фрагменты лент инвалидируются поколением, поэтому TTL может быть долгим
+FEED_CACHE_TIMEOUT = 60 * 60 * 3
+# Кэш id авторов, на которых подписан пользователь (posts.follow_cache);
+# сбрасывается сигналами Follow
+FOLLOWING_CACHE_TIMEOUT = 60 * 60
+
+# «Кого почитать»: manage.py compute_recommendations пересчитывает их
+# пакетом (по cron или задачей posts.compute_recommendations)
+RECOMMENDATIONS_PER_USER = 20
+RECOMMENDATIONS_SHOWN = 5
+# Сколько самых читаемых авторов участвуют в расчёте: матрица сходства
+# занимает RECOMMENDATION_AUTHORS² × 4 байта
+RECOMMENDATION_AUTHORS = 2000
+RECOMMENDATION_BATCH_SIZE = 500
+RECOMMENDATION_ACTIVITY_DAYS = 30
+
+# default — двухуровневый кэш: LRU в памяти процесса поверх shared.
+# Локально shared — файловый кэш; на боевом сервере его заменяют на
+# общий для всех воркеров (Redis, Memcached), default не меняется
 CACHES = {
     'default': {
+        'BACKEND': 'core.cache.TieredCache',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_TIMEOUT': 2,
+            'LOCAL_MAX_ENTRIES': 1000,
+            'STALE_TIMEOUT': 60,
+            'LOCK_TIMEOUT': 30,
+        },
+    },
+    # FileCache — файловый кэш с атомарным add, на нём держатся
+    # блокировки пересчёта default
+    'shared': {
+        'BACKEND': 'core.cache.FileCache',
+        'LOCATION': os.getenv(
+            'CACHE_DIR', os.path.join(tempfile.gettempdir(), 'yatube-cache')
+        ),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    # Сессии отдельно от shared: cache.clear() не должен разлогинивать
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv(
+            'SESSION_CACHE_DIR',
+            os.path.join(tempfile.gettempdir(), 'yatube-sessions')
+        ),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+    # Память процесса: корзины RATE_LIMITS в тестах. На сайте они лежат
+    # в shared, иначе у каждого воркера окажется свой лимит
+    'ratelimit': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'LOCATION': 'ratelimit',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
 }
 
+# Ограничение частоты записи: имя URL — корзины пользователя ('user')
+# и IP-адреса ('ip') в виде (запросов, за секунд) и учитываемые методы
+RATE_LIMITS = {
+    'posts:add_comment': {'user': (10, 60), 'ip': (30, 60)},
+    'posts:post_create': {'user': (5, 60), 'ip': (20, 60)},
+    'posts:profile_follow': {
+        'user': (30, 60), 'ip': (60, 60), 'methods': ('GET',),
+    },
+    'users:signup': {'ip': (5, 60 * 10)},
+}
+RATE_LIMIT_CACHE = os.getenv('RATE_LIMIT_CACHE', 'shared')
+
+# Обработка картинок при загрузке: больше IMAGE_INGEST_MAX_PIXELS
+# уменьшаются, метаданные удаляются, формат и качество — ниже
+IMAGE_INGEST_MAX_PIXELS = 1920 * 1080
+IMAGE_INGEST_FORMAT = os.getenv('IMAGE_INGEST_FORMAT', 'JPEG')
+IMAGE_INGEST_QUALITY = 82
+IMAGE_INGEST_WORKERS = 2
+IMAGE_INGEST_TIMEOUT = 30
+
+THUMBNAIL_BACKEND = 'posts.thumbnails.PipelineThumbnailBackend'
+# Размеры миниатюр, которые создаются сразу после загрузки картинки
+THUMBNAIL_PIPELINE_GEOMETRIES = {
+    '960x339': {'crop': 'center', 'upscale': True},
+}
+# 0 — создавать миниатюры синхронно в процессе запроса
+THUMBNAIL_PIPELINE_WORKERS = int(os.getenv('THUMBNAIL_PIPELINE_WORKERS', 2))
+# Сколько секунд картинка считается поставленной в очередь
+THUMBNAIL_PIPELINE_TIMEOUT = 300
+# Создавать миниатюры задачами core.jobs вместо пула процессов
+THUMBNAIL_PIPELINE_JOBS = os.getenv('THUMBNAIL_PIPELINE_JOBS') == '1'
+
+# Очередь фоновых задач core.jobs: таблица core_job и воркер run_jobs
+JOBS_CONCURRENCY = int(os.getenv('JOBS_CONCURRENCY', 4))
+JOBS_POLL_INTERVAL = 1
+JOBS_MAX_ATTEMPTS = 5
+# Пауза перед повтором, секунды: удваивается с каждой попыткой
+JOBS_BACKOFF_BASE = 5
+JOBS_BACKOFF_MAX = 60 * 60
+# Задача дольше этого считается брошенной упавшим воркером
+JOBS_RUNNING_TIMEOUT = 60 * 10
+# Сколько секунд хранятся выполненные задачи и их ключи идемпотентности
+JOBS_KEEP_DONE = 60 * 60 * 24 * 7
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]